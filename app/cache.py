@@ -0,0 +1,59 @@
+"""
+In-process TTL caches
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """Small thread-safe LRU cache whose entries expire after ttl_seconds"""
+
+    def __init__(self, ttl_seconds: float, maxsize: int = 256):
+        self.ttl = ttl_seconds
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+# Encoded route listing pages (JSON bytes), keyed by (active_only, offset, limit)
+route_list_cache = TTLCache(ttl_seconds=300)
+
+# Nearby-route results, keyed by rounded (lat, lon, radius_km) and limit
+nearby_routes_cache = TTLCache(ttl_seconds=30, maxsize=4096)
+
+
+# Active routes prepared for text matching (see RouteMatchingService)
+route_catalog_cache = TTLCache(ttl_seconds=300, maxsize=1)
+
+
+def clear_route_caches():
+    """Drop cached route responses; call after any write to the routes table"""
+    route_list_cache.clear()
+    nearby_routes_cache.clear()
+    route_catalog_cache.clear()
@@ -50,15 +50,30 @@ async def startup_event():
 
     # Initialize database
     try:
-        from app.models.database import create_tables, SessionLocal, init_sample_routes
+        from app.models.database import create_tables, SessionLocal, init_sample_routes, backfill_route_trig
         create_tables()
 
-        # Initialize sample routes
         db = SessionLocal()
         try:
-            init_sample_routes(db)
             init_badges(db)
             logger.info("✓ Badges initialized")
+
+            # Initialize sample routes. These read the routes trig columns,
+            # which create_tables() does not add to an existing table.
+            try:
+                init_sample_routes(db)
+                backfill_route_trig(db)
+
+                from app.services.route_index import RouteSpatialIndex
+                RouteSpatialIndex.rebuild(db)
+            except Exception as e:
+                db.rollback()
+                logger.error(
+                    f"✗ Route initialization failed: {e}. Databases created before the "
+                    "trig columns need: ALTER TABLE routes ADD COLUMN origin_sin_lat FLOAT, "
+                    "ADD COLUMN origin_cos_lat FLOAT, ADD COLUMN dest_sin_lat FLOAT, "
+                    "ADD COLUMN dest_cos_lat FLOAT"
+                )
         finally:
             db.close()
 
@@ -5,7 +5,9 @@ from app.models.database import (
     Base,
     engine,
     SessionLocal,
+    AsyncSessionLocal,
     get_db,
+    get_async_db,
     create_tables,
     UserType,
     User,
@@ -26,7 +28,9 @@ __all__ = [
     'Base',
     'engine',
     'SessionLocal',
+    'AsyncSessionLocal',
     'get_db',
+    'get_async_db',
     'create_tables',
     'UserType',
     'User',
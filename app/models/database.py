@@ -4,13 +4,16 @@ D-Nerve Database Models - PostgreSQL with User model
 
 from sqlalchemy import (
     Column, Integer, String, Float, Boolean, DateTime,
-    Text, Index, Enum, ForeignKey, create_engine, UniqueConstraint
+    Text, Index, Enum, ForeignKey, create_engine, UniqueConstraint, event
 )
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, relationship
+from fastapi import HTTPException
 from datetime import datetime
 import enum
 import logging
+import math
 
 from app.config import settings
 
@@ -26,6 +29,54 @@ engine = create_engine(
 # Session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+# Sync URL scheme -> async driver scheme; async schemes map to themselves
+_ASYNC_SCHEMES = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "postgresql+asyncpg": "postgresql+asyncpg",
+    "postgresql+psycopg": "postgresql+psycopg",  # psycopg 3 is async-capable
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+    "sqlite+aiosqlite": "sqlite+aiosqlite",
+}
+
+
+def _async_database_url(url: str) -> str:
+    """Map the sync DATABASE_URL onto its async driver"""
+    scheme, sep, rest = url.partition("://")
+    if not sep or scheme not in _ASYNC_SCHEMES:
+        raise ValueError(
+            f"DATABASE_URL scheme '{scheme}' has no known async driver; "
+            f"use one of: {', '.join(sorted(_ASYNC_SCHEMES))}"
+        )
+    return f"{_ASYNC_SCHEMES[scheme]}://{rest}"
+
+
+# Async session factory for handlers that must not block the event loop.
+# Bound to its engine on first use (see get_async_engine).
+AsyncSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False)
+
+_async_engine = None
+
+
+def get_async_engine():
+    """
+    Async engine (asyncpg / aiosqlite), created on first use
+
+    Building it lazily means an unmapped DATABASE_URL or a missing async
+    driver only fails the async handlers, not the whole app at import.
+    """
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = create_async_engine(
+            _async_database_url(settings.DATABASE_URL),
+            pool_pre_ping=True,
+            echo=False
+        )
+        AsyncSessionLocal.configure(bind=_async_engine)
+    return _async_engine
+
 # Base class
 Base = declarative_base()
 
@@ -163,6 +214,7 @@ class Trip(Base):
     __table_args__ = (
         Index('idx_trip_driver', 'driver_id'),
         Index('idx_trip_date', 'start_time'),
+        Index('idx_trip_driver_created', driver_id, created_at.desc()),
     )
 
 
@@ -191,6 +243,14 @@ class Withdrawal(Base):
     
     __table_args__ = (
         Index('idx_withdrawal_driver', 'driver_id'),
+        # Covers withdrawal history so it can be served by an index-only scan
+        Index(
+            'idx_withdrawal_driver_created', driver_id, created_at.desc(),
+            postgresql_include=[
+                'id', 'withdrawal_id', 'amount', 'points_deducted',
+                'payment_method', 'account_number', 'status'
+            ]
+        ),
     )
 
 
@@ -210,6 +270,12 @@ class Route(Base):
     dest_lat = Column(Float, nullable=False)
     dest_lon = Column(Float, nullable=False)
     
+    # Precomputed latitude trig for distance queries (kept in sync on write)
+    origin_sin_lat = Column(Float, nullable=True)
+    origin_cos_lat = Column(Float, nullable=True)
+    dest_sin_lat = Column(Float, nullable=True)
+    dest_cos_lat = Column(Float, nullable=True)
+    
     distance_km = Column(Float, default=0)
     avg_duration_minutes = Column(Float, default=0)
     fare_egp = Column(Float, default=0)
@@ -219,6 +285,27 @@ class Route(Base):
     
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index('idx_route_origin_latlon', 'origin_lat', 'origin_lon'),
+        Index('idx_route_dest_latlon', 'dest_lat', 'dest_lon'),
+    )
+
+
+def set_route_trig(route: Route):
+    """Fill a route's precomputed sin/cos latitude columns"""
+    origin_lat = math.radians(route.origin_lat)
+    dest_lat = math.radians(route.dest_lat)
+    route.origin_sin_lat = math.sin(origin_lat)
+    route.origin_cos_lat = math.cos(origin_lat)
+    route.dest_sin_lat = math.sin(dest_lat)
+    route.dest_cos_lat = math.cos(dest_lat)
+
+
+@event.listens_for(Route, "before_insert")
+@event.listens_for(Route, "before_update")
+def _route_trig_listener(mapper, connection, target):
+    set_route_trig(target)
 
 
 class PointsTransaction(Base):
@@ -242,6 +329,7 @@ class PointsTransaction(Base):
     __table_args__ = (
         Index('idx_points_driver', 'driver_id'),
         Index('idx_points_date', 'created_at'),
+        Index('idx_points_driver_id_desc', driver_id, id.desc()),
     )
 
 
@@ -351,12 +439,33 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    """Dependency to get an async database session"""
+    try:
+        get_async_engine()
+    except Exception as e:  # unmapped URL scheme or async driver not installed
+        logger.error(f"✗ Async database unavailable: {e}")
+        raise HTTPException(status_code=503, detail="Database unavailable")
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 def create_tables():
     """Create all tables"""
     Base.metadata.create_all(bind=engine)
     logger.info("✓ Database tables created")
 
 
+def backfill_route_trig(db):
+    """Fill trig columns on routes written before they existed"""
+    routes = db.query(Route).filter(Route.origin_sin_lat.is_(None)).all()
+    for route in routes:
+        set_route_trig(route)
+    if routes:
+        db.commit()
+        logger.info(f"✓ Backfilled trig columns on {len(routes)} routes")
+
+
 def init_sample_routes(db):
     """
     Initialize Cairo microbus routes - EXACT routes used for ML training
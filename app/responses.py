@@ -0,0 +1,22 @@
+"""
+Shared JSON response classes
+"""
+
+import orjson
+from fastapi.responses import Response
+
+
+class UTCORJSONResponse(Response):
+    """orjson response that renders naive (UTC) datetimes with a 'Z' suffix"""
+
+    media_type = "application/json"
+
+    OPTIONS = (
+        orjson.OPT_NON_STR_KEYS
+        | orjson.OPT_SERIALIZE_NUMPY
+        | orjson.OPT_NAIVE_UTC
+        | orjson.OPT_UTC_Z
+    )
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=self.OPTIONS)
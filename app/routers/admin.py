@@ -8,8 +8,10 @@ from typing import Optional
 from datetime import datetime
 from sqlalchemy.orm import Session
 
+from app.cache import clear_route_caches
 from app.models.database import get_db, Route
 from app.services.route_discovery import RouteDiscoveryService
+from app.services.route_index import RouteSpatialIndex
 
 router = APIRouter()
 
@@ -190,6 +192,8 @@ async def create_route(request: RouteCreateRequest, db: Session = Depends(get_db
     db.add(new_route)
     db.commit()
     db.refresh(new_route)
+    RouteSpatialIndex.invalidate()
+    clear_route_caches()
     
     return {
         "success": True,
@@ -209,6 +213,8 @@ async def toggle_route(route_id: str, db: Session = Depends(get_db)):
     
     route.is_active = not route.is_active
     db.commit()
+    RouteSpatialIndex.invalidate()
+    clear_route_caches()
     
     return {
         "route_id": route_id,
@@ -228,6 +234,8 @@ async def delete_route(route_id: str, db: Session = Depends(get_db)):
     
     db.delete(route)
     db.commit()
+    RouteSpatialIndex.invalidate()
+    clear_route_caches()
     
     return {
         "success": True,
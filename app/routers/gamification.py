@@ -2,16 +2,23 @@
 Gamification Router - PostgreSQL
 """
 
-from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi import APIRouter, HTTPException, Query, Depends, Header, Response
 from pydantic import BaseModel
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime
+from bisect import bisect_right
+from functools import lru_cache
+import hashlib
 import uuid
-from sqlalchemy.orm import Session
+import orjson
+from sqlalchemy import bindparam, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, load_only
 
-from app.models.database import get_db, Driver, Withdrawal, PointsTransaction
+from app.models.database import get_async_db, Driver, Withdrawal, PointsTransaction
+from app.responses import UTCORJSONResponse
 
-router = APIRouter()
+router = APIRouter(default_response_class=UTCORJSONResponse)
 
 
 # =============================================================================
@@ -26,9 +33,44 @@ TIER_THRESHOLDS = {
     "Diamond": 10000
 }
 
+# Tier lookup tables, presorted by threshold once at import
+_SORTED_TIERS = tuple(sorted(TIER_THRESHOLDS.items(), key=lambda x: x[1]))
+_TIER_NAMES = tuple(t[0] for t in _SORTED_TIERS)
+_TIER_MIN_POINTS = tuple(t[1] for t in _SORTED_TIERS)
+
 REWARD_RATE = 0.1  # 10 points = 1 EGP
 MIN_WITHDRAWAL_EGP = 5
 
+# Cache-Control for edge/CDN caching. /tiers carries a live driver
+# distribution, so it gets a much shorter lifetime than the static config.
+STATIC_CACHE_CONTROL = "public, max-age=86400"
+TIERS_CACHE_CONTROL = "public, max-age=300"
+
+TIER_BENEFITS = {
+    "Bronze": ["Basic rewards", "Standard support"],
+    "Silver": ["5% bonus on all points", "Priority support", "Monthly bonus: 50 points"],
+    "Gold": ["10% bonus on all points", "Priority support", "Monthly bonus: 100 points", "Exclusive badge"],
+    "Platinum": ["15% bonus on all points", "VIP support", "Monthly bonus: 200 points", "Exclusive badge", "Featured on leaderboard"],
+    "Diamond": ["20% bonus on all points", "VIP support", "Monthly bonus: 500 points", "Diamond badge", "Featured on leaderboard", "Early access to new features"]
+}
+
+POINTS_CONFIG = {
+    "base_points": {
+        "per_trip": 10,
+        "description": "Base points earned per GPS point recorded"
+    },
+    "quality_multipliers": {
+        "excellent": {"threshold": "≥90%", "multiplier": 1.5},
+        "good": {"threshold": "≥70%", "multiplier": 1.2},
+        "fair": {"threshold": "≥50%", "multiplier": 1.0},
+        "poor": {"threshold": "<50%", "multiplier": 0.5}
+    },
+    "rewards": {
+        "rate": "10 points = 1 EGP",
+        "min_withdrawal": f"{MIN_WITHDRAWAL_EGP} EGP"
+    }
+}
+
 
 # =============================================================================
 # SCHEMAS
@@ -55,26 +97,74 @@ class WithdrawalResponse(BaseModel):
 # =============================================================================
 
 def calculate_tier(points: int) -> str:
-    if points >= 10000:
-        return "Diamond"
-    elif points >= 5000:
-        return "Platinum"
-    elif points >= 2000:
-        return "Gold"
-    elif points >= 500:
-        return "Silver"
-    return "Bronze"
+    # Negative balances still map to the lowest tier
+    return _TIER_NAMES[max(bisect_right(_TIER_MIN_POINTS, points) - 1, 0)]
 
 
+@lru_cache(maxsize=None)
 def get_tier_benefits(tier: str) -> List[str]:
-    benefits = {
-        "Bronze": ["Basic rewards", "Standard support"],
-        "Silver": ["5% bonus on all points", "Priority support", "Monthly bonus: 50 points"],
-        "Gold": ["10% bonus on all points", "Priority support", "Monthly bonus: 100 points", "Exclusive badge"],
-        "Platinum": ["15% bonus on all points", "VIP support", "Monthly bonus: 200 points", "Exclusive badge", "Featured on leaderboard"],
-        "Diamond": ["20% bonus on all points", "VIP support", "Monthly bonus: 500 points", "Diamond badge", "Featured on leaderboard", "Early access to new features"]
+    return TIER_BENEFITS.get(tier, [])
+
+
+def _static_json(payload: Dict) -> Tuple[bytes, str]:
+    """Serialize a static payload once and return (body, etag)"""
+    body = orjson.dumps(payload)
+    return body, '"' + hashlib.md5(body).hexdigest() + '"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check: any listed tag or '*', compared weakly (W/ ignored)"""
+    if not if_none_match:
+        return False
+    for token in if_none_match.split(","):
+        token = token.strip()
+        if token.startswith("W/"):
+            token = token[2:]
+        if token == "*" or token == etag:
+            return True
+    return False
+
+
+def _static_response(body: bytes, etag: str, if_none_match: Optional[str]) -> Response:
+    headers = {"ETag": etag, "Cache-Control": STATIC_CACHE_CONTROL}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+# Static response parts, built once at import
+_TIER_LIST = [
+    {
+        "name": tier,
+        "min_points": points,
+        "benefits": get_tier_benefits(tier)
     }
-    return benefits.get(tier, [])
+    for tier, points in TIER_THRESHOLDS.items()
+]
+
+_REWARD_RATE_INFO = {
+    "points_per_egp": 10,
+    "egp_per_point": REWARD_RATE,
+    "description": "10 points = 1 EGP"
+}
+
+_POINTS_CONFIG_BODY, _POINTS_CONFIG_ETAG = _static_json(POINTS_CONFIG)
+
+# Prebuilt statements; values are passed as bind parameters per request
+_DRIVER_BY_ID_STMT = select(Driver).where(Driver.driver_id == bindparam("driver_id"))
+
+_DRIVER_RANK_STMT = select(func.count()).select_from(Driver).where(
+    Driver.total_points > bindparam("points")
+)
+
+_TIER_COUNT_STMT = select(func.count()).select_from(Driver).where(Driver.tier == bindparam("tier"))
+
+_LEADERBOARD_BASE_STMT = select(Driver).options(joinedload(Driver.user))
+_LEADERBOARD_STMTS = {
+    "quality_avg": _LEADERBOARD_BASE_STMT.order_by(Driver.quality_avg.desc()),
+    "trips_completed": _LEADERBOARD_BASE_STMT.order_by(Driver.trips_completed.desc()),
+    "total_points": _LEADERBOARD_BASE_STMT.order_by(Driver.total_points.desc()),
+}
 
 
 # =============================================================================
@@ -85,16 +175,12 @@ def get_tier_benefits(tier: str) -> List[str]:
 async def get_leaderboard(
     limit: int = Query(10, ge=1, le=100),
     sort_by: str = Query("total_points"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get driver leaderboard"""
     
-    if sort_by == "quality_avg":
-        drivers = db.query(Driver).order_by(Driver.quality_avg.desc()).limit(limit).all()
-    elif sort_by == "trips_completed":
-        drivers = db.query(Driver).order_by(Driver.trips_completed.desc()).limit(limit).all()
-    else:
-        drivers = db.query(Driver).order_by(Driver.total_points.desc()).limit(limit).all()
+    stmt = _LEADERBOARD_STMTS.get(sort_by, _LEADERBOARD_STMTS["total_points"])
+    drivers = (await db.scalars(stmt.limit(limit))).all()
     
     leaderboard = []
     for rank, driver in enumerate(drivers, 1):
@@ -109,67 +195,58 @@ async def get_leaderboard(
             "quality_avg": round(driver.quality_avg, 2)
         })
     
-    return {
+    return UTCORJSONResponse({
         "leaderboard": leaderboard,
         "sort_by": sort_by,
         "total_drivers": len(leaderboard),
-        "updated_at": datetime.utcnow().isoformat() + 'Z'
-    }
+        "updated_at": datetime.utcnow()
+    })
 
 
 @router.get("/gamification/tiers")
-async def get_tier_info(db: Session = Depends(get_db)):
+async def get_tier_info(response: Response, db: AsyncSession = Depends(get_async_db)):
     """Get tier information"""
     
+    response.headers["Cache-Control"] = TIERS_CACHE_CONTROL
+    
     # Get tier distribution
     distribution = {}
     for tier in TIER_THRESHOLDS.keys():
-        distribution[tier] = db.query(Driver).filter(Driver.tier == tier).count()
+        distribution[tier] = await db.scalar(_TIER_COUNT_STMT, {"tier": tier})
     
     return {
-        "tiers": [
-            {
-                "name": tier,
-                "min_points": points,
-                "benefits": get_tier_benefits(tier)
-            }
-            for tier, points in TIER_THRESHOLDS.items()
-        ],
+        "tiers": _TIER_LIST,
         "distribution": distribution,
-        "reward_rate": {
-            "points_per_egp": 10,
-            "egp_per_point": REWARD_RATE,
-            "description": "10 points = 1 EGP"
-        },
+        "reward_rate": _REWARD_RATE_INFO,
         "min_withdrawal_egp": MIN_WITHDRAWAL_EGP
     }
 
 
 @router.get("/gamification/drivers/{driver_id}/score")
-async def get_driver_score(driver_id: str, db: Session = Depends(get_db)):
+async def get_driver_score(driver_id: str, db: AsyncSession = Depends(get_async_db)):
     """Get driver's gamification score"""
     
-    driver = db.query(Driver).filter(Driver.driver_id == driver_id).first()
+    driver = await db.scalar(_DRIVER_BY_ID_STMT, {"driver_id": driver_id})
     
     if not driver:
         raise HTTPException(status_code=404, detail="Driver not found")
     
     # Calculate rank
-    rank = db.query(Driver).filter(Driver.total_points > driver.total_points).count() + 1
+    rank = await db.scalar(_DRIVER_RANK_STMT, {"points": driver.total_points}) + 1
     
     # Calculate next tier
     current_points = driver.total_points
     next_tier = None
     
-    for tier, threshold in sorted(TIER_THRESHOLDS.items(), key=lambda x: x[1]):
-        if threshold > current_points:
-            next_tier = {
-                "name": tier,
-                "points_required": threshold,
-                "points_needed": threshold - current_points,
-                "progress_percent": round((current_points / threshold) * 100, 1) if threshold > 0 else 100
-            }
-            break
+    idx = bisect_right(_TIER_MIN_POINTS, current_points)
+    if idx < len(_TIER_MIN_POINTS):
+        threshold = _TIER_MIN_POINTS[idx]
+        next_tier = {
+            "name": _TIER_NAMES[idx],
+            "points_required": threshold,
+            "points_needed": threshold - current_points,
+            "progress_percent": round((current_points / threshold) * 100, 1) if threshold > 0 else 100
+        }
     
     if not next_tier:
         next_tier = {"name": "Diamond", "points_needed": 0, "progress_percent": 100, "message": "Maximum tier reached!"}
@@ -190,10 +267,10 @@ async def get_driver_score(driver_id: str, db: Session = Depends(get_db)):
 
 
 @router.post("/gamification/drivers/{driver_id}/withdraw", response_model=WithdrawalResponse)
-async def request_withdrawal(driver_id: str, request: WithdrawalRequest, db: Session = Depends(get_db)):
+async def request_withdrawal(driver_id: str, request: WithdrawalRequest, db: AsyncSession = Depends(get_async_db)):
     """Request a withdrawal"""
     
-    driver = db.query(Driver).filter(Driver.driver_id == driver_id).first()
+    driver = await db.scalar(_DRIVER_BY_ID_STMT, {"driver_id": driver_id})
     
     if not driver:
         raise HTTPException(status_code=404, detail="Driver not found")
@@ -243,8 +320,7 @@ async def request_withdrawal(driver_id: str, request: WithdrawalRequest, db: Ses
     )
     
     db.add(transaction)
-    db.commit()
-    db.refresh(withdrawal)
+    await db.commit()
     
     return WithdrawalResponse(
         withdrawal_id=withdrawal.withdrawal_id,
@@ -258,17 +334,25 @@ async def request_withdrawal(driver_id: str, request: WithdrawalRequest, db: Ses
 
 
 @router.get("/gamification/drivers/{driver_id}/withdrawals")
-async def get_withdrawal_history(driver_id: str, db: Session = Depends(get_db)):
+async def get_withdrawal_history(driver_id: str, db: AsyncSession = Depends(get_async_db)):
     """Get withdrawal history"""
     
-    driver = db.query(Driver).filter(Driver.driver_id == driver_id).first()
+    driver = await db.scalar(_DRIVER_BY_ID_STMT, {"driver_id": driver_id})
     
     if not driver:
         raise HTTPException(status_code=404, detail="Driver not found")
     
-    withdrawals = db.query(Withdrawal).filter(Withdrawal.driver_id == driver_id).order_by(Withdrawal.created_at.desc()).all()
-    
-    return {
+    withdrawals = (await db.scalars(
+        select(Withdrawal).options(
+            load_only(
+                Withdrawal.withdrawal_id, Withdrawal.amount, Withdrawal.points_deducted,
+                Withdrawal.payment_method, Withdrawal.account_number, Withdrawal.status,
+                Withdrawal.created_at
+            )
+        ).where(Withdrawal.driver_id == driver_id).order_by(Withdrawal.created_at.desc())
+    )).all()
+    
+    return UTCORJSONResponse({
         "withdrawals": [
             {
                 "withdrawal_id": w.withdrawal_id,
@@ -277,12 +361,12 @@ async def get_withdrawal_history(driver_id: str, db: Session = Depends(get_db)):
                 "payment_method": w.payment_method,
                 "account_number": w.account_number,
                 "status": w.status,
-                "created_at": w.created_at.isoformat() + "Z" if w.created_at else None
+                "created_at": w.created_at
             }
             for w in withdrawals
         ],
         "total": len(withdrawals)
-    }
+    })
 
 
 @router.get("/gamification/drivers/{driver_id}/history")
@@ -290,21 +374,39 @@ async def get_points_history(
     driver_id: str,
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db)
+    before_id: Optional[int] = Query(None, ge=1),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get points transaction history"""
+    """
+    Get points transaction history
+
+    Pass the returned next_before_id as before_id to fetch the next page
+    (keyset pagination). Keyset pages report has_more instead of total and
+    offset; offset is kept for older clients and ignored with before_id.
+    """
     
-    driver = db.query(Driver).filter(Driver.driver_id == driver_id).first()
+    driver = await db.scalar(_DRIVER_BY_ID_STMT, {"driver_id": driver_id})
     
     if not driver:
         raise HTTPException(status_code=404, detail="Driver not found")
     
-    total = db.query(PointsTransaction).filter(PointsTransaction.driver_id == driver_id).count()
-    transactions = db.query(PointsTransaction).filter(
-        PointsTransaction.driver_id == driver_id
-    ).order_by(PointsTransaction.created_at.desc()).offset(offset).limit(limit).all()
-    
-    return {
+    if before_id is not None:
+        stmt = select(PointsTransaction).where(
+            PointsTransaction.driver_id == driver_id,
+            PointsTransaction.id < before_id
+        )
+    else:
+        # Total comes back on every row via COUNT(*) OVER (), saving a round-trip
+        stmt = select(PointsTransaction, func.count().over().label("total")).where(
+            PointsTransaction.driver_id == driver_id
+        ).offset(offset)
+    # One extra row tells whether another page follows
+    rows = (await db.execute(stmt.order_by(PointsTransaction.id.desc()).limit(limit + 1))).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    transactions = [row[0] for row in rows]
+    
+    response = {
         "driver_id": driver_id,
         "transactions": [
             {
@@ -312,32 +414,33 @@ async def get_points_history(
                 "points": t.points,
                 "description": t.description,
                 "balance_after": t.balance_after,
-                "timestamp": t.created_at.isoformat() + "Z" if t.created_at else None
+                "timestamp": t.created_at
             }
             for t in transactions
         ],
-        "total": total,
         "limit": limit,
-        "offset": offset
+        "next_before_id": transactions[-1].id if has_more else None
     }
+    if before_id is not None:
+        response["has_more"] = has_more
+    else:
+        if rows:
+            response["total"] = rows[0].total
+        elif offset:
+            # Past the last page there are no rows to carry the total
+            response["total"] = await db.scalar(
+                select(func.count()).select_from(PointsTransaction).where(
+                    PointsTransaction.driver_id == driver_id
+                )
+            )
+        else:
+            response["total"] = 0
+        response["offset"] = offset
+    
+    return UTCORJSONResponse(response)
 
 
 @router.get("/gamification/points-config")
-async def get_points_config():
+async def get_points_config(if_none_match: Optional[str] = Header(None)):
     """Get points configuration"""
-    return {
-        "base_points": {
-            "per_trip": 10,
-            "description": "Base points earned per GPS point recorded"
-        },
-        "quality_multipliers": {
-            "excellent": {"threshold": "≥90%", "multiplier": 1.5},
-            "good": {"threshold": "≥70%", "multiplier": 1.2},
-            "fair": {"threshold": "≥50%", "multiplier": 1.0},
-            "poor": {"threshold": "<50%", "multiplier": 0.5}
-        },
-        "rewards": {
-            "rate": "10 points = 1 EGP",
-            "min_withdrawal": f"{MIN_WITHDRAWAL_EGP} EGP"
-        }
-    }
\ No newline at end of file
+    return _static_response(_POINTS_CONFIG_BODY, _POINTS_CONFIG_ETAG, if_none_match)
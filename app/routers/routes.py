@@ -3,17 +3,29 @@ Routes Router - Reads ML-trained routes from database
 Includes route matching for custom routes
 """
 
-from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi import APIRouter, HTTPException, Query, Depends, Response
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Tuple
 from datetime import datetime
+from sqlalchemy import bindparam, select
 from sqlalchemy.orm import Session
+from functools import lru_cache
 import math
+import numpy as np
+import orjson
 
+try:
+    import numexpr as ne
+except ImportError:  # optional; NumPy path is used instead
+    ne = None
+
+from app.cache import route_list_cache, nearby_routes_cache
 from app.models.database import get_db, Route
 from app.services.route_matching import RouteMatchingService
+from app.services.route_index import RouteSpatialIndex
+from app.responses import UTCORJSONResponse
 
-router = APIRouter()
+router = APIRouter(default_response_class=UTCORJSONResponse)
 
 
 # =============================================================================
@@ -88,18 +100,99 @@ class DistanceEstimateRequest(BaseModel):
 # HELPER FUNCTIONS
 # =============================================================================
 
+# Candidate count above which haversine_a hands off to numexpr (if installed)
+NUMEXPR_MIN_ROWS = 50_000
+
+_DEG_TO_RAD = math.pi / 180
+_sin, _cos, _asin, _sqrt = math.sin, math.cos, math.asin, math.sqrt
+
+
 def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """Calculate distance in km between two coordinates"""
-    R = 6371
-    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-    return R * 2 * math.asin(math.sqrt(a))
+    # Scalar path: plain float math, no list/map allocation or attribute lookups
+    lat1 *= _DEG_TO_RAD
+    lat2 *= _DEG_TO_RAD
+    sin_dlat = _sin((lat2 - lat1) * 0.5)
+    sin_dlon = _sin((lon2 - lon1) * (_DEG_TO_RAD * 0.5))
+    a = sin_dlat * sin_dlat + _cos(lat1) * _cos(lat2) * sin_dlon * sin_dlon
+    return 12742 * _asin(_sqrt(a))
+
+
+def point_trig(lat: float, lon: float) -> Tuple[float, float, float]:
+    """(sin(lat), cos(lat), lon in radians) for a query point"""
+    lat_rad = math.radians(lat)
+    return math.sin(lat_rad), math.cos(lat_rad), math.radians(lon)
+
+
+def haversine_a(
+    sin_lat1: float, cos_lat1: float, lon1_rad: float,
+    sin_lat2: np.ndarray, cos_lat2: np.ndarray, lon2_rad: np.ndarray
+) -> np.ndarray:
+    """
+    Haversine term a = hav(d / R) from precomputed latitude sin/cos
+
+    Uses hav(d) = (1 - sin1*sin2 - cos1*cos2*cos(dlon)) / 2, so each
+    pair costs one cos. a grows monotonically with distance, so radius
+    checks can compare a against haversine_a_threshold directly.
+    """
+    if ne is not None and len(sin_lat2) >= NUMEXPR_MIN_ROWS:
+        # Threaded single pass, no temporaries; only pays off on large batches
+        a = ne.evaluate(
+            "(1 - sin_lat1 * sin_lat2 - cos_lat1 * cos_lat2 * cos(lon2_rad - lon1_rad)) / 2"
+        )
+    else:
+        a = (1 - sin_lat1 * sin_lat2 - cos_lat1 * cos_lat2 * np.cos(lon2_rad - lon1_rad)) / 2
+    return np.clip(a, 0, 1)
+
 
+def haversine_a_threshold(radius_km: float) -> float:
+    """Value of the haversine term a at exactly radius_km"""
+    return math.sin(radius_km / (2 * 6371)) ** 2
 
-def route_to_response(route: Route) -> dict:
-    """Convert database Route to Android-compatible response"""
+
+def haversine_km_from_a(a: np.ndarray) -> np.ndarray:
+    """Finish the haversine: distance in km from the a term"""
+    return 6371 * 2 * np.arcsin(np.sqrt(a))
+
+
+def route_trig_arrays(routes: List, end: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Pack a route end's (sin(lat), cos(lat), lon radians) into arrays"""
+    n = len(routes)
+    sin_lat = np.fromiter((getattr(r, f"{end}_sin_lat") for r in routes), dtype=np.float64, count=n)
+    cos_lat = np.fromiter((getattr(r, f"{end}_cos_lat") for r in routes), dtype=np.float64, count=n)
+    lon = np.fromiter((getattr(r, f"{end}_lon") for r in routes), dtype=np.float64, count=n)
+    return sin_lat, cos_lat, np.radians(lon)
+
+
+# Columns read by route_to_response; queries load only these, not whole Routes
+ROUTE_RESPONSE_COLUMNS = (
+    Route.route_id, Route.origin, Route.destination, Route.avg_duration_minutes,
+    Route.trip_count, Route.distance_km, Route.fare_egp,
+    Route.origin_lat, Route.origin_lon, Route.dest_lat, Route.dest_lon
+)
+
+# Extra columns read by route_trig_arrays
+ROUTE_TRIG_COLUMNS = (
+    Route.origin_sin_lat, Route.origin_cos_lat, Route.dest_sin_lat, Route.dest_cos_lat
+)
+
+# Prebuilt lookup; route_id is passed as a bind parameter per request
+_ROUTE_BY_ID_STMT = select(Route).where(Route.route_id == bindparam("route_id"))
+
+
+@lru_cache(maxsize=8192)
+def estimate_distance_cached(origin_lat: float, origin_lon: float, dest_lat: float, dest_lon: float) -> float:
+    """Memoized RouteMatchingService.estimate_distance (callers round the inputs)"""
+    return RouteMatchingService.estimate_distance(
+        origin_lat=origin_lat,
+        origin_lon=origin_lon,
+        dest_lat=dest_lat,
+        dest_lon=dest_lon
+    )
+
+
+def route_to_response(route) -> dict:
+    """Convert a Route (or a row of ROUTE_RESPONSE_COLUMNS) to Android-compatible response"""
     return {
         "route_id": route.route_id,
         "start_name": route.origin,           # Map origin -> start_name
@@ -116,6 +209,51 @@ def route_to_response(route: Route) -> dict:
     }
 
 
+# Widening of the cached candidate radius; covers the ~75 m a point can
+# move when rounded to 3 decimals for the cache key
+NEARBY_KEY_SLACK_KM = 0.1
+
+
+def nearby_route_candidates(
+    lat: float, lon: float, radius_km: float, db: Session
+) -> Tuple[List, Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """Active routes with an origin in the radius_km bounding box, plus their origin trig arrays"""
+    route_ids = RouteSpatialIndex.candidates(
+        db, origin_box=RouteMatchingService.bounding_box(lat, lon, radius_km)
+    )
+    routes = db.query(*ROUTE_RESPONSE_COLUMNS, *ROUTE_TRIG_COLUMNS).filter(
+        Route.route_id.in_(route_ids),
+        Route.is_active == True
+    ).all() if route_ids else []
+    return routes, route_trig_arrays(routes, "origin")
+
+
+def find_nearby_routes(
+    lat: float, lon: float, radius_km: float, limit: int,
+    routes: List, origin_trig: Tuple[np.ndarray, np.ndarray, np.ndarray]
+) -> List[dict]:
+    """
+    The nearest `limit` candidate routes whose origin is within radius_km
+    of (lat, lon), by exact Haversine distance
+    """
+    if not routes:
+        return []
+
+    a = haversine_a(*point_trig(lat, lon), *origin_trig)
+    matches = np.flatnonzero(a <= haversine_a_threshold(radius_km))
+    # a grows with distance, so ordering by it orders by distance
+    nearest = matches[np.argsort(a[matches], kind="stable")[:limit]]
+    distance = haversine_km_from_a(a[nearest])
+
+    nearby_routes = []
+    for i, route_distance in zip(nearest, distance):
+        response = route_to_response(routes[i])
+        response['distance_from_user_km'] = round(float(route_distance), 2)
+        nearby_routes.append(response)
+
+    return nearby_routes
+
+
 # =============================================================================
 # ENDPOINTS
 # =============================================================================
@@ -137,7 +275,12 @@ async def get_routes(
     - popularity (trip_count)
     - distance_km
     """
-    query = db.query(Route)
+    cache_key = (active_only, offset, limit)
+    body = route_list_cache.get(cache_key)
+    if body is not None:
+        return Response(content=body, media_type="application/json")
+
+    query = db.query(*ROUTE_RESPONSE_COLUMNS)
 
     if active_only:
         query = query.filter(Route.is_active == True)
@@ -147,8 +290,11 @@ async def get_routes(
 
     routes = query.offset(offset).limit(limit).all()
 
-    # Convert to Android-compatible format
-    return [route_to_response(route) for route in routes]
+    # Convert to Android-compatible format and encode once; the cached
+    # bytes are served as-is, skipping response_model validation
+    body = orjson.dumps([route_to_response(route) for route in routes])
+    route_list_cache.set(cache_key, body)
+    return Response(content=body, media_type="application/json")
 
 
 @router.get("/routes/{route_id}")
@@ -156,7 +302,7 @@ async def get_route(route_id: str, db: Session = Depends(get_db)):
     """
     Get details of a specific route
     """
-    route = db.query(Route).filter(Route.route_id == route_id).first()
+    route = db.scalar(_ROUTE_BY_ID_STMT, {"route_id": route_id})
 
     if not route:
         raise HTTPException(status_code=404, detail="Route not found")
@@ -185,33 +331,45 @@ async def search_routes(request: RouteSearchRequest, db: Session = Depends(get_d
     """
     Search for routes near origin and destination
     """
-    routes = db.query(Route).filter(Route.is_active == True).all()
+    # Prune by bounding box in the spatial index before the exact Haversine check
+    route_ids = RouteSpatialIndex.candidates(
+        db,
+        origin_box=RouteMatchingService.bounding_box(
+            request.origin_lat, request.origin_lon, request.radius_km
+        ),
+        dest_box=RouteMatchingService.bounding_box(
+            request.dest_lat, request.dest_lon, request.radius_km
+        )
+    )
+    routes = db.query(*ROUTE_RESPONSE_COLUMNS, *ROUTE_TRIG_COLUMNS).filter(
+        Route.route_id.in_(route_ids),
+        Route.is_active == True
+    ).all() if route_ids else []
     matching_routes = []
 
-    for route in routes:
-        # Check origin distance
-        origin_dist = haversine_distance(
-            request.origin_lat, request.origin_lon,
-            route.origin_lat, route.origin_lon
+    if routes:
+        origin_a = haversine_a(
+            *point_trig(request.origin_lat, request.origin_lon),
+            *route_trig_arrays(routes, "origin")
         )
-
-        # Check destination distance
-        dest_dist = haversine_distance(
-            request.dest_lat, request.dest_lon,
-            route.dest_lat, route.dest_lon
+        dest_a = haversine_a(
+            *point_trig(request.dest_lat, request.dest_lon),
+            *route_trig_arrays(routes, "dest")
         )
 
-        if origin_dist <= request.radius_km and dest_dist <= request.radius_km:
-            response = route_to_response(route)
-            response['origin_distance_km'] = round(origin_dist, 2)
-            response['dest_distance_km'] = round(dest_dist, 2)
+        # Radius test on a; asin/sqrt only for the matches
+        a_threshold = haversine_a_threshold(request.radius_km)
+        matches = np.flatnonzero((origin_a <= a_threshold) & (dest_a <= a_threshold))
+        origin_dist = haversine_km_from_a(origin_a[matches])
+        dest_dist = haversine_km_from_a(dest_a[matches])
+
+        # Sort by combined distance
+        for j in np.argsort(origin_dist + dest_dist, kind="stable"):
+            response = route_to_response(routes[matches[j]])
+            response['origin_distance_km'] = round(float(origin_dist[j]), 2)
+            response['dest_distance_km'] = round(float(dest_dist[j]), 2)
             matching_routes.append(response)
 
-    # Sort by combined distance
-    matching_routes.sort(
-        key=lambda x: x['origin_distance_km'] + x['dest_distance_km']
-    )
-
     return {
         "routes": matching_routes,
         "total": len(matching_routes),
@@ -228,24 +386,27 @@ async def get_nearby_routes(
     lat: float = Query(..., ge=-90, le=90),
     lon: float = Query(..., ge=-180, le=180),
     radius_km: float = Query(2.0, ge=0.1, le=10),
+    limit: int = Query(50, ge=1, le=100),
     db: Session = Depends(get_db)
 ):
     """
     Get routes with origins near a location
+    
+    Candidate routes are cached for 30 seconds per (lat, lon) rounded to
+    3 decimals (~100 m), fetched over a slightly widened radius so that
+    /commuter/nearby-routes and repeat polls share one lookup. The radius
+    test and distances always use the exact (lat, lon) of the request.
     """
-    routes = db.query(Route).filter(Route.is_active == True).all()
-    nearby_routes = []
-
-    for route in routes:
-        distance = haversine_distance(lat, lon, route.origin_lat, route.origin_lon)
-
-        if distance <= radius_km:
-            response = route_to_response(route)
-            response['distance_from_user_km'] = round(distance, 2)
-            nearby_routes.append(response)
+    cache_key = (round(lat, 3), round(lon, 3), round(radius_km, 2))
+    candidates = nearby_routes_cache.get(cache_key)
+    if candidates is None:
+        key_lat, key_lon, key_radius_km = cache_key
+        candidates = nearby_route_candidates(
+            key_lat, key_lon, key_radius_km + NEARBY_KEY_SLACK_KM, db
+        )
+        nearby_routes_cache.set(cache_key, candidates)
 
-    # Sort by distance
-    nearby_routes.sort(key=lambda x: x['distance_from_user_km'])
+    nearby_routes = find_nearby_routes(lat, lon, radius_km, limit, *candidates)
 
     return {
         "routes": nearby_routes,
@@ -260,12 +421,13 @@ async def commuter_nearby_routes(
     lat: float = Query(..., ge=-90, le=90),
     lon: float = Query(..., ge=-180, le=180),
     radius_km: float = Query(1.0, ge=0.1, le=10),
+    limit: int = Query(50, ge=1, le=100),
     db: Session = Depends(get_db)
 ):
     """
     Get microbus routes near a location (for commuter app)
     """
-    return await get_nearby_routes(lat, lon, radius_km, db)
+    return await get_nearby_routes(lat, lon, radius_km, limit, db)
 
 
 @router.get("/commuter/route-eta")
@@ -278,7 +440,7 @@ async def commuter_route_eta(
     """
     Get ETA for a specific route from current location
     """
-    route = db.query(Route).filter(Route.route_id == route_id).first()
+    route = db.scalar(_ROUTE_BY_ID_STMT, {"route_id": route_id})
 
     if not route:
         raise HTTPException(status_code=404, detail="Route not found")
@@ -336,11 +498,12 @@ async def estimate_distance(request: DistanceEstimateRequest):
     Uses Haversine formula with road factor (1.35x straight line).
     Use this when no matching route found but coordinates are available.
     """
-    distance = RouteMatchingService.estimate_distance(
-        origin_lat=request.origin_lat,
-        origin_lon=request.origin_lon,
-        dest_lat=request.dest_lat,
-        dest_lon=request.dest_lon
+    # Rounded to 4 decimals (~11 m) so repeated home/work pairs hit the cache
+    distance = estimate_distance_cached(
+        round(request.origin_lat, 4),
+        round(request.origin_lon, 4),
+        round(request.dest_lat, 4),
+        round(request.dest_lon, 4)
     )
     
     return {
@@ -3,16 +3,19 @@ Trips Router - PostgreSQL
 """
 
 from fastapi import APIRouter, HTTPException, Query, Depends
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter
 from typing import List, Optional
 from datetime import datetime
-import json
+from bisect import bisect_right
 import random
+import numpy as np
+from sqlalchemy import bindparam, func, select, update
 from sqlalchemy.orm import Session
 
 from app.models.database import get_db, Driver, Trip, PointsTransaction
+from app.responses import UTCORJSONResponse
 
-router = APIRouter()
+router = APIRouter(default_response_class=UTCORJSONResponse)
 
 
 # =============================================================================
@@ -35,6 +38,17 @@ class TripSubmission(BaseModel):
     gps_points: List[GPSPoint]
 
 
+# Tier lookup tables, ascending by minimum points
+_TIER_NAMES = ("Bronze", "Silver", "Gold", "Platinum", "Diamond")
+_TIER_MIN_POINTS = (0, 500, 2000, 5000, 10000)
+
+# Serializes a whole GPS point list in one pass in pydantic-core
+GPS_POINTS_ADAPTER = TypeAdapter(List[GPSPoint])
+
+# Prebuilt lookup; trip_id is passed as a bind parameter per request
+_TRIP_BY_ID_STMT = select(Trip).where(Trip.trip_id == bindparam("trip_id"))
+
+
 class TripResponse(BaseModel):
     trip_id: str
     status: str
@@ -50,15 +64,8 @@ class TripResponse(BaseModel):
 # =============================================================================
 
 def calculate_tier(points: int) -> str:
-    if points >= 10000:
-        return "Diamond"
-    elif points >= 5000:
-        return "Platinum"
-    elif points >= 2000:
-        return "Gold"
-    elif points >= 500:
-        return "Silver"
-    return "Bronze"
+    # Negative balances still map to the lowest tier
+    return _TIER_NAMES[max(bisect_right(_TIER_MIN_POINTS, points) - 1, 0)]
 
 
 def calculate_quality_score(gps_points: List[GPSPoint]) -> float:
@@ -72,12 +79,15 @@ def calculate_quality_score(gps_points: List[GPSPoint]) -> float:
     elif len(gps_points) >= 10:
         score += 0.1
     
-    accurate = sum(1 for p in gps_points if p.accuracy_meters and p.accuracy_meters < 20)
+    # Missing (or zero) accuracy counts as inaccurate
+    accuracy = np.fromiter(
+        (p.accuracy_meters or np.inf for p in gps_points),
+        dtype=np.float64, count=len(gps_points)
+    )
+    accurate = int(np.count_nonzero(accuracy < 20))
     if accurate > len(gps_points) * 0.8:
         score += 0.1
     
-    score += random.uniform(-0.05, 0.05)
-    
     return min(max(score, 0.0), 1.0)
 
 
@@ -95,11 +105,6 @@ def calculate_points(quality_score: float, gps_count: int) -> int:
 async def submit_trip(submission: TripSubmission, db: Session = Depends(get_db)):
     """Submit a completed trip"""
     
-    # Validate driver
-    driver = db.query(Driver).filter(Driver.driver_id == submission.driver_id).first()
-    if not driver:
-        raise HTTPException(status_code=404, detail="Driver not found")
-    
     # Validate GPS points
     if len(submission.gps_points) < 5:
         raise HTTPException(status_code=400, detail="Trip must have at least 5 GPS points")
@@ -129,25 +134,44 @@ async def submit_trip(submission: TripSubmission, db: Session = Depends(get_db))
         end_time=end_dt,
         duration_minutes=duration,
         gps_points_count=len(submission.gps_points),
-        gps_points_json=json.dumps([p.dict() for p in submission.gps_points]),
+        gps_points_json=GPS_POINTS_ADAPTER.dump_json(submission.gps_points).decode(),
         quality_score=quality_score,
         points_earned=points_earned,
         status="completed"
     )
     
-    db.add(trip)
+    # Update driver in one statement; SET expressions see the old row values
+    updated = db.execute(
+        update(Driver)
+        .where(Driver.driver_id == submission.driver_id)
+        .values(
+            total_points=Driver.total_points + points_earned,
+            trips_completed=Driver.trips_completed + 1,
+            rewards_earned=(Driver.total_points + points_earned) * 0.1,
+            quality_avg=(Driver.quality_avg * Driver.trips_completed + quality_score)
+                        / (Driver.trips_completed + 1)
+        )
+        .returning(Driver.total_points, Driver.tier)
+        .execution_options(synchronize_session=False)
+    ).first()
+    
+    if not updated:
+        db.rollback()
+        raise HTTPException(status_code=404, detail="Driver not found")
     
-    # Update driver
-    driver.total_points += points_earned
-    driver.trips_completed += 1
-    driver.rewards_earned = driver.total_points * 0.1
+    total_points, tier = updated
     
-    # Update quality average
-    total_quality = driver.quality_avg * (driver.trips_completed - 1) + quality_score
-    driver.quality_avg = total_quality / driver.trips_completed
+    # Update tier (rare, so only when it actually changes)
+    new_tier = calculate_tier(total_points)
+    if new_tier != tier:
+        db.execute(
+            update(Driver)
+            .where(Driver.driver_id == submission.driver_id)
+            .values(tier=new_tier)
+            .execution_options(synchronize_session=False)
+        )
     
-    # Update tier
-    driver.tier = calculate_tier(driver.total_points)
+    db.add(trip)
     
     # Log points transaction
     transaction = PointsTransaction(
@@ -157,7 +181,7 @@ async def submit_trip(submission: TripSubmission, db: Session = Depends(get_db))
         description=f"Trip completed - {len(submission.gps_points)} GPS points",
         reference_type="trip",
         reference_id=trip_id,
-        balance_after=driver.total_points
+        balance_after=total_points
     )
     
     db.add(transaction)
@@ -168,8 +192,8 @@ async def submit_trip(submission: TripSubmission, db: Session = Depends(get_db))
         status="completed",
         quality_score=round(quality_score, 2),
         points_earned=points_earned,
-        driver_total_points=driver.total_points,
-        driver_tier=driver.tier,
+        driver_total_points=total_points,
+        driver_tier=new_tier,
         message=f"Trip recorded! Earned {points_earned} points."
     )
 
@@ -183,53 +207,60 @@ async def list_trips(
 ):
     """List trips with optional driver filter"""
     
-    query = db.query(Trip)
-    
-    if driver_id:
-        query = query.filter(Trip.driver_id == driver_id)
+    trip_filter = (Trip.driver_id == driver_id,) if driver_id else ()
     
-    total = query.count()
-    trips = query.order_by(Trip.created_at.desc()).offset(offset).limit(limit).all()
+    # Total comes back on every row via COUNT(*) OVER (), saving a round-trip
+    rows = db.query(Trip, func.count().over().label("total")).filter(*trip_filter).order_by(
+        Trip.created_at.desc()
+    ).offset(offset).limit(limit).all()
+    trips = [t for t, _ in rows]
+    if rows:
+        total = rows[0].total
+    elif offset:
+        # Past the last page there are no rows to carry the total
+        total = db.query(func.count(Trip.id)).filter(*trip_filter).scalar()
+    else:
+        total = 0
     
-    return {
+    return UTCORJSONResponse({
         "trips": [
             {
                 "trip_id": t.trip_id,
                 "driver_id": t.driver_id,
                 "route_id": t.route_id,
-                "start_time": t.start_time.isoformat() + "Z" if t.start_time else None,
-                "end_time": t.end_time.isoformat() + "Z" if t.end_time else None,
+                "start_time": t.start_time,
+                "end_time": t.end_time,
                 "duration_minutes": round(t.duration_minutes, 1),
                 "gps_points_count": t.gps_points_count,
                 "gps_points_json": t.gps_points_json,
                 "quality_score": round(t.quality_score, 2),
                 "points_earned": t.points_earned,
                 "status": t.status,
-                "created_at": t.created_at.isoformat() + "Z" if t.created_at else None
+                "created_at": t.created_at
             }
             for t in trips
         ],
         "total": total,
         "limit": limit,
         "offset": offset
-    }
+    })
 
 
 @router.get("/trips/{trip_id}")
 async def get_trip(trip_id: str, db: Session = Depends(get_db)):
     """Get trip details"""
     
-    trip = db.query(Trip).filter(Trip.trip_id == trip_id).first()
+    trip = db.scalar(_TRIP_BY_ID_STMT, {"trip_id": trip_id})
     
     if not trip:
         raise HTTPException(status_code=404, detail="Trip not found")
     
-    return {
+    return UTCORJSONResponse({
         "trip_id": trip.trip_id,
         "driver_id": trip.driver_id,
         "route_id": trip.route_id,
-        "start_time": trip.start_time.isoformat() + "Z" if trip.start_time else None,
-        "end_time": trip.end_time.isoformat() + "Z" if trip.end_time else None,
+        "start_time": trip.start_time,
+        "end_time": trip.end_time,
         "duration_minutes": round(trip.duration_minutes, 1),
         "gps_points_count": trip.gps_points_count,
         "gps_points_json": trip.gps_points_json,
@@ -237,8 +268,8 @@ async def get_trip(trip_id: str, db: Session = Depends(get_db)):
         "quality_score": round(trip.quality_score, 2),
         "points_earned": trip.points_earned,
         "status": trip.status,
-        "created_at": trip.created_at.isoformat() + "Z" if trip.created_at else None
-    }
+        "created_at": trip.created_at
+    })
 
 
 @router.get("/drivers/{driver_id}/trips")
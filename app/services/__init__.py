@@ -4,9 +4,11 @@ Services Package
 from app.services.gamification import GamificationService
 from app.services.route_matching import RouteMatchingService
 from app.services.route_discovery import RouteDiscoveryService
+from app.services.route_index import RouteSpatialIndex
 
 __all__ = [
     "GamificationService",
     "RouteMatchingService",
-    "RouteDiscoveryService"
+    "RouteDiscoveryService",
+    "RouteSpatialIndex"
 ]
\ No newline at end of file
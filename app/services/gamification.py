@@ -3,12 +3,27 @@ D-Nerve Gamification Service
 Driver scoring, leaderboards, and incentive calculation
 """
 
+import math
 import numpy as np
-from dataclasses import dataclass, asdict
+from bisect import bisect_right
+import heapq
+from dataclasses import dataclass
+from functools import cached_property, lru_cache
+from operator import attrgetter
 from typing import Dict, List, Optional, Tuple, Any
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from enum import Enum
 import logging
+import time
+
+from sortedcontainers import SortedList
+
+from app.cache import TTLCache
+
+try:
+    from numba import njit
+except ImportError:  # optional; NumPy kernels are used instead
+    njit = None
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +49,11 @@ TIER_THRESHOLDS = {
     DriverTier.DIAMOND: 10000
 }
 
+# Tier lookup tables for bisect, ascending by threshold
+_SORTED_TIERS = tuple(sorted(TIER_THRESHOLDS.items(), key=lambda x: x[1]))
+_TIER_VALUES = tuple(t[0] for t in _SORTED_TIERS)
+_TIER_MIN_POINTS = tuple(t[1] for t in _SORTED_TIERS)
+
 POINTS_CONFIG = {
     'trip_base': 10,
     'quality_excellent': 1.5,
@@ -49,17 +69,51 @@ POINTS_CONFIG = {
     'referral_bonus': 50,
 }
 
+# Time-of-day multiplier indexed by trip start hour
+_HOUR_MULT = tuple(
+    POINTS_CONFIG['peak_hour_bonus'] if (7 <= h <= 9 or 17 <= h <= 19)
+    else POINTS_CONFIG['off_peak_bonus'] if (h >= 22 or h <= 5)
+    else 1.0
+    for h in range(24)
+)
+
+_HOUR_MULT_ARR = np.array(_HOUR_MULT)
+
+# Quality multiplier by score band: <50, 50-70, 70-90, >=90
+_QUALITY_CUTS = (50, 70, 90)
+_QUALITY_MULTS = (
+    POINTS_CONFIG['quality_poor'],
+    POINTS_CONFIG['quality_fair'],
+    POINTS_CONFIG['quality_good'],
+    POINTS_CONFIG['quality_excellent'],
+)
+_QUALITY_CUTS_ARR = np.array(_QUALITY_CUTS, dtype=np.float64)
+_QUALITY_MULTS_ARR = np.array(_QUALITY_MULTS)
+
 REWARD_RATE = 0.1  # 1 point = 0.1 EGP
 MIN_WITHDRAWAL = 100
 
 
+_EPOCH_NAIVE = datetime(1970, 1, 1)
+_EPOCH_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _epoch_seconds(dt: datetime) -> float:
+    return (dt - (_EPOCH_NAIVE if dt.tzinfo is None else _EPOCH_UTC)).total_seconds()
+
+
 # =============================================================================
 # DATA CLASSES
 # =============================================================================
 
-@dataclass
+@dataclass(frozen=True)
 class TripData:
-    """GPS trip data submitted by driver"""
+    """
+    GPS trip data submitted by driver
+
+    Frozen so the cached `arrays` always match gps_points; build a new
+    TripData (dataclasses.replace) rather than editing the point list.
+    """
     trip_id: str
     driver_id: str
     start_time: datetime
@@ -75,6 +129,22 @@ class TripData:
     def num_points(self) -> int:
         return len(self.gps_points)
 
+    @cached_property
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        gps_points as (lats, lons, ts) float64 arrays, built once
+
+        ts is seconds since the 1970 epoch, measured against an epoch with the
+        same tzinfo as each point so naive times are not read as local time
+        and gaps match (p2 - p1).total_seconds() to the microsecond.
+        """
+        n = self.num_points
+        points = self.gps_points
+        lats = np.fromiter((p[0] for p in points), dtype=np.float64, count=n)
+        lons = np.fromiter((p[1] for p in points), dtype=np.float64, count=n)
+        ts = np.fromiter((_epoch_seconds(p[2]) for p in points), dtype=np.float64, count=n)
+        return lats, lons, ts
+
 
 @dataclass
 class QualityScore:
@@ -88,7 +158,15 @@ class QualityScore:
     details: Dict[str, Any] = None
 
     def to_dict(self) -> Dict:
-        return asdict(self)
+        return {
+            'trip_id': self.trip_id,
+            'overall_score': self.overall_score,
+            'completeness': self.completeness,
+            'accuracy': self.accuracy,
+            'consistency': self.consistency,
+            'coverage': self.coverage,
+            'details': self.details
+        }
 
 
 @dataclass
@@ -138,13 +216,81 @@ class PointsEarned:
     breakdown: Dict[str, Any] = None
 
     def to_dict(self) -> Dict:
-        return asdict(self)
+        return {
+            'trip_id': self.trip_id,
+            'driver_id': self.driver_id,
+            'base_points': self.base_points,
+            'quality_multiplier': self.quality_multiplier,
+            'streak_bonus': self.streak_bonus,
+            'coverage_bonus': self.coverage_bonus,
+            'peak_bonus': self.peak_bonus,
+            'total_points': self.total_points,
+            'breakdown': self.breakdown
+        }
 
 
 # =============================================================================
 # DATA QUALITY SCORER
 # =============================================================================
 
+def _haversine_vec(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """Distances (km) between consecutive points along the last axis (N -> N-1)"""
+    lat_r = np.radians(lat)
+    lon_r = np.radians(lon)
+    dlat = np.diff(lat_r)
+    dlon = np.diff(lon_r)
+    a = np.sin(dlat/2)**2 + np.cos(lat_r[..., :-1]) * np.cos(lat_r[..., 1:]) * np.sin(dlon/2)**2
+    return 6371 * 2 * np.arcsin(np.sqrt(a))
+
+
+# Per-track kernels used by the single-trip scorers. With numba installed
+# they are replaced by fused loops that make one pass without temporaries.
+
+def _track_length_km(lats: np.ndarray, lons: np.ndarray) -> float:
+    return float(_haversine_vec(lats, lons).sum())
+
+
+def _count_in_bounds(lats: np.ndarray, lons: np.ndarray, lat_lo: float, lat_hi: float,
+                     lon_lo: float, lon_hi: float) -> int:
+    return int(np.count_nonzero(
+        (lats >= lat_lo) & (lats <= lat_hi) & (lons >= lon_lo) & (lons <= lon_hi)
+    ))
+
+
+def _count_good_gaps(ts: np.ndarray, max_gap: float) -> int:
+    return int(np.count_nonzero(np.diff(ts) <= max_gap))
+
+
+if njit is not None:
+    @njit(cache=True, fastmath=True, boundscheck=False)
+    def _track_length_km(lats, lons):
+        total = 0.0
+        for i in range(1, lats.shape[0]):
+            lat1 = math.radians(lats[i - 1])
+            lat2 = math.radians(lats[i])
+            dlat = lat2 - lat1
+            dlon = math.radians(lons[i] - lons[i - 1])
+            a = math.sin(dlat * 0.5) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon * 0.5) ** 2
+            total += math.asin(math.sqrt(a))
+        return 12742.0 * total
+
+    @njit(cache=True, fastmath=True, boundscheck=False)
+    def _count_in_bounds(lats, lons, lat_lo, lat_hi, lon_lo, lon_hi):
+        count = 0
+        for i in range(lats.shape[0]):
+            if lat_lo <= lats[i] <= lat_hi and lon_lo <= lons[i] <= lon_hi:
+                count += 1
+        return count
+
+    @njit(cache=True, fastmath=True, boundscheck=False)
+    def _count_good_gaps(ts, max_gap):
+        count = 0
+        for i in range(1, ts.shape[0]):
+            if ts[i] - ts[i - 1] <= max_gap:
+                count += 1
+        return count
+
+
 class DataQualityScorer:
     """Evaluates the quality of GPS trip data"""
 
@@ -164,6 +310,11 @@ class DataQualityScorer:
             'lon_min': 31.0,
             'lon_max': 31.6
         }
+        # (lat_min, lat_max, lon_min, lon_max), unpacked once for the scorers
+        self._box = (
+            self.bounds['lat_min'], self.bounds['lat_max'],
+            self.bounds['lon_min'], self.bounds['lon_max']
+        )
 
     def score_trip(self, trip: TripData) -> QualityScore:
         """Calculate quality score for a trip"""
@@ -188,6 +339,74 @@ class DataQualityScorer:
             }
         )
 
+    def score_trips(self, trips: List[TripData]) -> List[QualityScore]:
+        """
+        Score a batch of trips at once
+
+        All tracks are concatenated into flat arrays, so work is proportional
+        to the total point count. Per-trip sums are bincounts keyed by trip
+        index, and the segments joining one trip's last point to the next
+        trip's first point are masked out.
+        """
+        if not trips:
+            return []
+
+        k = len(trips)
+        counts = np.fromiter((t.num_points for t in trips), dtype=np.int64, count=k)
+        offsets = np.concatenate(([0], np.cumsum(counts)))
+        lats = np.empty(offsets[-1])
+        lons = np.empty(offsets[-1])
+        ts = np.empty(offsets[-1])
+        for i, trip in enumerate(trips):
+            if counts[i]:
+                start, end = offsets[i], offsets[i + 1]
+                lats[start:end], lons[start:end], ts[start:end] = trip.arrays
+
+        point_trip = np.repeat(np.arange(k), counts)
+        seg_trip = point_trip[:-1]
+        seg_valid = seg_trip == point_trip[1:]
+        has_segments = counts >= 2
+        seg_counts = np.maximum(counts - 1, 1)
+
+        expected = np.fromiter((self._expected_points(t) for t in trips), dtype=np.float64, count=k)
+        completeness = np.where(
+            expected > 0, np.minimum(100, counts / np.maximum(expected, 1) * 100), 0
+        )
+
+        lat_lo, lat_hi, lon_lo, lon_hi = self._box
+        in_bounds = np.bincount(
+            point_trip[(lats >= lat_lo) & (lats <= lat_hi) & (lons >= lon_lo) & (lons <= lon_hi)],
+            minlength=k
+        )
+        accuracy = np.where(counts > 0, in_bounds / np.maximum(counts, 1) * 100, 0)
+
+        good_gaps = np.bincount(seg_trip[(np.diff(ts) <= self.max_gap) & seg_valid], minlength=k)
+        consistency = np.where(has_segments, good_gaps / seg_counts * 100, 0)
+
+        distance = np.bincount(
+            seg_trip[seg_valid], weights=_haversine_vec(lats, lons)[seg_valid], minlength=k
+        )
+        coverage = np.where(has_segments, np.minimum(100, distance / 5.0 * 100), 0)
+
+        overall = (completeness + accuracy + consistency + coverage) / 4
+
+        return [
+            QualityScore(
+                trip_id=trip.trip_id,
+                overall_score=round(float(overall[i]), 2),
+                completeness=round(float(completeness[i]), 2),
+                accuracy=round(float(accuracy[i]), 2),
+                consistency=round(float(consistency[i]), 2),
+                coverage=round(float(coverage[i]), 2),
+                details={
+                    'num_points': trip.num_points,
+                    'duration_min': round(trip.duration_minutes, 2),
+                    'expected_points': int(expected[i])
+                }
+            )
+            for i, trip in enumerate(trips)
+        ]
+
     def _score_completeness(self, trip: TripData) -> float:
         expected = self._expected_points(trip)
         if expected == 0:
@@ -202,39 +421,24 @@ class DataQualityScorer:
     def _score_accuracy(self, trip: TripData) -> float:
         if not trip.gps_points:
             return 0
-        valid = sum(1 for lat, lon, _ in trip.gps_points
-                   if self.bounds['lat_min'] <= lat <= self.bounds['lat_max']
-                   and self.bounds['lon_min'] <= lon <= self.bounds['lon_max'])
-        return (valid / len(trip.gps_points)) * 100
+        lats, lons, _ = trip.arrays
+        valid = _count_in_bounds(lats, lons, *self._box)
+        return (valid / len(lats)) * 100
 
     def _score_consistency(self, trip: TripData) -> float:
         if len(trip.gps_points) < 2:
             return 0
-        gaps = []
-        for i in range(1, len(trip.gps_points)):
-            gap = (trip.gps_points[i][2] - trip.gps_points[i-1][2]).total_seconds()
-            gaps.append(gap)
-        good_gaps = sum(1 for g in gaps if g <= self.max_gap)
-        return (good_gaps / len(gaps)) * 100
+        _, _, ts = trip.arrays
+        good_gaps = _count_good_gaps(ts, self.max_gap)
+        return (good_gaps / (len(ts) - 1)) * 100
 
     def _score_coverage(self, trip: TripData) -> float:
         if len(trip.gps_points) < 2:
             return 0
-        total_distance = 0
-        for i in range(1, len(trip.gps_points)):
-            lat1, lon1, _ = trip.gps_points[i-1]
-            lat2, lon2, _ = trip.gps_points[i]
-            total_distance += self._haversine(lat1, lon1, lat2, lon2)
+        lats, lons, _ = trip.arrays
+        total_distance = _track_length_km(lats, lons)
         return min(100, (total_distance / 5.0) * 100)
 
-    @staticmethod
-    def _haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-        R = 6371
-        lat1, lon1, lat2, lon2 = map(np.radians, [lat1, lon1, lat2, lon2])
-        dlat, dlon = lat2 - lat1, lon2 - lon1
-        a = np.sin(dlat/2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon/2)**2
-        return R * 2 * np.arcsin(np.sqrt(a))
-
 
 # =============================================================================
 # DRIVER SCORER
@@ -251,33 +455,22 @@ class DriverScorer:
         self,
         trip: TripData,
         driver_streak: int = 0,
-        is_new_route: bool = False
+        is_new_route: bool = False,
+        quality: Optional[QualityScore] = None
     ) -> PointsEarned:
-        """Calculate points earned for a single trip"""
-        quality = self.quality_scorer.score_trip(trip)
+        """Calculate points earned for a single trip; pass quality if already scored"""
+        if quality is None:
+            quality = self.quality_scorer.score_trip(trip)
         base_points = self.config['trip_base']
 
         # Quality multiplier
-        if quality.overall_score >= 90:
-            quality_mult = self.config['quality_excellent']
-        elif quality.overall_score >= 70:
-            quality_mult = self.config['quality_good']
-        elif quality.overall_score >= 50:
-            quality_mult = self.config['quality_fair']
-        else:
-            quality_mult = self.config['quality_poor']
+        quality_mult = _QUALITY_MULTS[bisect_right(_QUALITY_CUTS, quality.overall_score)]
 
         streak_bonus = driver_streak * self.config['daily_streak_bonus']
         coverage_bonus = self.config['new_route_bonus'] if is_new_route else 0
 
         # Peak hour bonus
-        hour = trip.start_time.hour
-        if 7 <= hour <= 9 or 17 <= hour <= 19:
-            peak_mult = self.config['peak_hour_bonus']
-        elif 22 <= hour or hour <= 5:
-            peak_mult = self.config['off_peak_bonus']
-        else:
-            peak_mult = 1.0
+        peak_mult = _HOUR_MULT[trip.start_time.hour]
 
         trip_points = int(base_points * quality_mult * peak_mult)
         total_points = trip_points + streak_bonus + coverage_bonus
@@ -297,12 +490,42 @@ class DriverScorer:
             }
         )
 
-    def get_tier(self, total_points: int) -> DriverTier:
-        tier = DriverTier.BRONZE
-        for t, threshold in TIER_THRESHOLDS.items():
-            if total_points >= threshold:
-                tier = t
-        return tier
+    def calculate_trips_points(
+        self,
+        trips: List[TripData],
+        qualities: List[QualityScore]
+    ) -> List[PointsEarned]:
+        """Points for a batch of already-scored trips, with no streak or new-route bonus"""
+        k = len(trips)
+        base_points = self.config['trip_base']
+        scores = np.fromiter((q.overall_score for q in qualities), dtype=np.float64, count=k)
+        hours = np.fromiter((t.start_time.hour for t in trips), dtype=np.int64, count=k)
+
+        quality_mults = _QUALITY_MULTS_ARR[np.searchsorted(_QUALITY_CUTS_ARR, scores, side='right')]
+        peak_mults = _HOUR_MULT_ARR[hours]
+        totals = (base_points * quality_mults * peak_mults).astype(np.int64)
+
+        return [
+            PointsEarned(
+                trip_id=trip.trip_id,
+                driver_id=trip.driver_id,
+                base_points=base_points,
+                quality_multiplier=float(quality_mults[i]),
+                streak_bonus=0,
+                coverage_bonus=0,
+                peak_bonus=float(peak_mults[i]),
+                total_points=int(totals[i]),
+                breakdown={
+                    'quality_score': qualities[i].overall_score,
+                    'formula': f"({base_points} × {quality_mults[i]} × {peak_mults[i]}) + 0 + 0"
+                }
+            )
+            for i, trip in enumerate(trips)
+        ]
+
+    @staticmethod
+    def get_tier(total_points: int) -> DriverTier:
+        return _TIER_VALUES[max(bisect_right(_TIER_MIN_POINTS, total_points) - 1, 0)]
 
 
 # =============================================================================
@@ -314,8 +537,29 @@ class LeaderboardManager:
 
     def __init__(self):
         self._drivers: Dict[str, DriverScore] = {}
+        # (-total_points, driver_id) for every driver, kept sorted on update
+        self._by_points = SortedList()
+        # Drivers per tier, adjusted only when a driver changes tier
+        self._tier_counts: Dict[DriverTier, int] = {tier: 0 for tier in DriverTier}
+
+    @staticmethod
+    def _points_key(driver: DriverScore) -> Tuple[int, str]:
+        return (-driver.total_points, driver.driver_id)
 
     def update_driver(self, driver_id: str, points_earned: PointsEarned, quality_score: float):
+        self._apply_trips(driver_id, points_earned.total_points, quality_score, 1)
+
+    def update_driver_batch(self, updates: Dict[str, List[Tuple[PointsEarned, float]]]):
+        """Apply several trips per driver with one running-average and tier update each"""
+        for driver_id, trips in updates.items():
+            self._apply_trips(
+                driver_id,
+                sum(points.total_points for points, _ in trips),
+                sum(quality for _, quality in trips),
+                len(trips)
+            )
+
+    def _apply_trips(self, driver_id: str, points_sum: int, quality_sum: float, k: int):
         if driver_id not in self._drivers:
             self._drivers[driver_id] = DriverScore(
                 driver_id=driver_id,
@@ -326,54 +570,64 @@ class LeaderboardManager:
                 current_streak=0,
                 longest_streak=0
             )
+            self._tier_counts[DriverTier.BRONZE] += 1
+        else:
+            self._by_points.remove(self._points_key(self._drivers[driver_id]))
 
         driver = self._drivers[driver_id]
-        driver.total_points += points_earned.total_points
-        driver.trips_completed += 1
-
-        n = driver.trips_completed
-        driver.quality_avg = ((driver.quality_avg * (n-1)) + quality_score) / n
-        driver.current_tier = DriverScorer().get_tier(driver.total_points)
+        n0 = driver.trips_completed
+        driver.total_points += points_sum
+        driver.trips_completed += k
+        self._by_points.add(self._points_key(driver))
+
+        driver.quality_avg = ((driver.quality_avg * n0) + quality_sum) / driver.trips_completed
+        tier = DriverScorer.get_tier(driver.total_points)
+        if tier is not driver.current_tier:
+            self._tier_counts[driver.current_tier] -= 1
+            self._tier_counts[tier] += 1
+            driver.current_tier = tier
         driver.rewards_earned = driver.total_points * REWARD_RATE
 
     def get_leaderboard(self, limit: int = 10, sort_by: str = 'total_points') -> List[DriverScore]:
-        drivers = list(self._drivers.values())
-        
-        if sort_by == 'quality_avg':
-            drivers.sort(key=lambda d: d.quality_avg, reverse=True)
-        elif sort_by == 'trips_completed':
-            drivers.sort(key=lambda d: d.trips_completed, reverse=True)
+        if sort_by in ('quality_avg', 'trips_completed'):
+            key = attrgetter(sort_by)
+            if limit < len(self._drivers) // 4:
+                # Partial selection: O(N log limit) instead of a full sort
+                drivers = heapq.nlargest(limit, self._drivers.values(), key=key)
+            else:
+                drivers = sorted(self._drivers.values(), key=key, reverse=True)[:limit]
         else:
-            drivers.sort(key=lambda d: d.total_points, reverse=True)
+            drivers = [self._drivers[driver_id] for _, driver_id in self._by_points[:limit]]
 
-        for i, driver in enumerate(drivers[:limit]):
+        for i, driver in enumerate(drivers):
             driver.rank = i + 1
 
-        return drivers[:limit]
+        return drivers
 
     def get_driver_score(self, driver_id: str) -> Optional[DriverScore]:
-        if driver_id in self._drivers:
-            driver = self._drivers[driver_id]
-            # Calculate rank
-            leaderboard = self.get_leaderboard(limit=len(self._drivers))
-            for d in leaderboard:
-                if d.driver_id == driver_id:
-                    driver.rank = d.rank
-                    break
-            return driver
-        return None
+        driver = self._drivers.get(driver_id)
+        if driver is not None:
+            driver.rank = self._by_points.index(self._points_key(driver)) + 1
+        return driver
 
     def get_tier_distribution(self) -> Dict[str, int]:
-        distribution = {tier.value: 0 for tier in DriverTier}
-        for driver in self._drivers.values():
-            distribution[driver.current_tier.value] += 1
-        return distribution
+        return {tier.value: count for tier, count in self._tier_counts.items()}
 
 
 # =============================================================================
 # GAMIFICATION SERVICE
 # =============================================================================
 
+@lru_cache(maxsize=1)
+def _iso_second(epoch_second: int) -> str:
+    return datetime.fromtimestamp(epoch_second, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def _utc_timestamp() -> str:
+    """Current UTC time as ISO-8601 with 'Z', formatted at most once per second"""
+    return _iso_second(int(time.time()))
+
+
 class GamificationService:
     """Main service class combining all gamification components"""
 
@@ -381,6 +635,8 @@ class GamificationService:
         self.quality_scorer = DataQualityScorer()
         self.driver_scorer = DriverScorer(self.quality_scorer)
         self.leaderboard = LeaderboardManager()
+        # Leaderboard reads; rankings may lag writes by up to 5 s
+        self._read_cache = TTLCache(ttl_seconds=5, maxsize=32)
         logger.info("✓ GamificationService initialized")
 
     def process_trip(
@@ -391,7 +647,9 @@ class GamificationService:
     ) -> Dict:
         """Process a completed trip and update driver score"""
         quality = self.quality_scorer.score_trip(trip)
-        points = self.driver_scorer.calculate_trip_points(trip, driver_streak, is_new_route)
+        points = self.driver_scorer.calculate_trip_points(
+            trip, driver_streak, is_new_route, quality=quality
+        )
         self.leaderboard.update_driver(trip.driver_id, points, quality.overall_score)
         driver = self.leaderboard.get_driver_score(trip.driver_id)
 
@@ -400,16 +658,53 @@ class GamificationService:
             'quality': quality.to_dict(),
             'points_earned': points.to_dict(),
             'driver': driver.to_dict() if driver else None,
-            'timestamp': datetime.utcnow().isoformat() + 'Z'
+            'timestamp': _utc_timestamp()
         }
 
+    def process_trips(self, trips: List[TripData]) -> List[Dict]:
+        """
+        Process a batch of completed trips, scoring their quality together
+
+        Each driver is updated once for all of their trips in the batch, so
+        every result carries the driver's standing after the whole batch.
+        """
+        qualities = self.quality_scorer.score_trips(trips)
+        points_earned = self.driver_scorer.calculate_trips_points(trips, qualities)
+
+        updates: Dict[str, List[Tuple[PointsEarned, float]]] = {}
+        for trip, quality, points in zip(trips, qualities, points_earned):
+            updates.setdefault(trip.driver_id, []).append((points, quality.overall_score))
+        self.leaderboard.update_driver_batch(updates)
+
+        drivers = {}
+        for driver_id in updates:
+            driver = self.leaderboard.get_driver_score(driver_id)
+            drivers[driver_id] = driver.to_dict() if driver else None
+
+        timestamp = _utc_timestamp()
+        return [
+            {
+                'trip_id': trip.trip_id,
+                'quality': quality.to_dict(),
+                'points_earned': points.to_dict(),
+                'driver': drivers[trip.driver_id],
+                'timestamp': timestamp
+            }
+            for trip, quality, points in zip(trips, qualities, points_earned)
+        ]
+
     def get_driver_stats(self, driver_id: str) -> Optional[Dict]:
         driver = self.leaderboard.get_driver_score(driver_id)
         return driver.to_dict() if driver else None
 
     def get_leaderboard(self, limit: int = 10) -> List[Dict]:
-        drivers = self.leaderboard.get_leaderboard(limit)
-        return [d.to_dict() for d in drivers]
+        cache_key = ('leaderboard', limit)
+        result = self._read_cache.get(cache_key)
+        if result is None:
+            result = tuple(d.to_dict() for d in self.leaderboard.get_leaderboard(limit))
+            self._read_cache.set(cache_key, result)
+        # Fresh dicts per caller so nobody can mutate the cached snapshot
+        return [dict(d) for d in result]
 
     def get_tier_info(self) -> Dict:
         return {
@@ -5,17 +5,102 @@ Uses DBSCAN to discover new routes from driver GPS trajectories
 
 import json
 import logging
+import math
+import multiprocessing
+import os
 import numpy as np
+import orjson
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Tuple
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from sklearn.cluster import DBSCAN
-from collections import defaultdict
+from sklearn.neighbors import NearestNeighbors
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 
+try:
+    from numba import njit
+except ImportError:  # optional; NumPy paths are used instead
+    njit = None
+
+from app.cache import clear_route_caches
 from app.models.database import Route, Trip, SessionLocal
+from app.services.route_index import RouteSpatialIndex
 
 logger = logging.getLogger(__name__)
 
+EARTH_RADIUS_M = 6371000
+
+# (start_lat, start_lon, end_lat, end_lon, distance_km)
+TrajectoryFeatures = Tuple[float, float, float, float, float]
+
+
+if njit is not None:
+    @njit(cache=True, fastmath=True)
+    def _haversine_scalar(lat1, lon1, lat2, lon2):
+        lat1 = math.radians(lat1)
+        lat2 = math.radians(lat2)
+        dlat = lat2 - lat1
+        dlon = math.radians(lon2 - lon1)
+        a = math.sin(dlat / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon / 2) ** 2
+        return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+    @njit(cache=True, fastmath=True)
+    def _nearest_hub_idx(lat, lon, hub_lats, hub_lons, max_m):
+        """Index of the closest hub within max_m metres, or -1"""
+        # Plain argmin in the loop; the threshold is applied once afterwards
+        best = 0
+        best_distance = np.inf
+        for i in range(hub_lats.shape[0]):
+            distance = _haversine_scalar(lat, lon, hub_lats[i], hub_lons[i])
+            if distance < best_distance:
+                best_distance = distance
+                best = i
+        return best if best_distance <= max_m else -1
+
+    @njit(cache=True, fastmath=True)
+    def _track_central_angles(lat_r, lon_r):
+        """Sum of haversine central angles between consecutive radian points"""
+        total = 0.0
+        prev_cos = math.cos(lat_r[0])
+        for i in range(1, lat_r.shape[0]):
+            cos_lat = math.cos(lat_r[i])  # reused as the next segment's start
+            dlat = (lat_r[i] - lat_r[i - 1]) * 0.5
+            dlon = (lon_r[i] - lon_r[i - 1]) * 0.5
+            a = math.sin(dlat) ** 2 + prev_cos * cos_lat * math.sin(dlon) ** 2
+            total += math.asin(math.sqrt(a))
+            prev_cos = cos_lat
+        return total
+
+
+@dataclass
+class TrajectoryBatch:
+    """Trajectory features as parallel arrays, one entry per trip"""
+    start_lat: np.ndarray
+    start_lon: np.ndarray
+    end_lat: np.ndarray
+    end_lon: np.ndarray
+    distance_km: np.ndarray
+    duration_minutes: np.ndarray  # NaN where the trip has no duration
+
+    @classmethod
+    def from_features(
+        cls,
+        features: List[TrajectoryFeatures],
+        durations: List[Optional[float]]
+    ) -> "TrajectoryBatch":
+        columns = np.array(features, dtype=np.float64).reshape(-1, 5).T
+        duration_minutes = np.array(
+            [np.nan if d is None else d for d in durations], dtype=np.float64
+        )
+        return cls(*(np.ascontiguousarray(column) for column in columns), duration_minutes)
+
+    def __len__(self) -> int:
+        return len(self.start_lat)
+
 
 class RouteDiscoveryService:
     """
@@ -26,6 +111,12 @@ class RouteDiscoveryService:
     EPSILON_METERS = 200  # Maximum distance between points in same cluster
     MIN_SAMPLES = 3       # Minimum trips to form a route
     MIN_GPS_POINTS = 10   # Minimum GPS points per trip
+    MAX_DISTANCE_POINTS = 500  # Longer tracks are decimated before summing distance
+    
+    # Feature extraction batching; larger runs are spread over CPU cores
+    EXTRACT_CHUNK_SIZE = 1000
+    PARALLEL_MIN_TRIPS = 5000
+    MAX_EXTRACT_WORKERS = 4  # Leave cores for the web workers serving requests
     
     # Cairo hub coordinates for snapping route endpoints
     CAIRO_HUBS = {
@@ -51,11 +142,18 @@ class RouteDiscoveryService:
         "Downtown": (30.0459, 31.2394),
     }
     
+    # Hub coordinates as arrays, in CAIRO_HUBS order
+    _HUB_NAMES = tuple(CAIRO_HUBS)
+    _HUB_LATS = np.array([coords[0] for coords in CAIRO_HUBS.values()])
+    _HUB_LONS = np.array([coords[1] for coords in CAIRO_HUBS.values()])
+    _HUB_LATS_RAD = np.radians(_HUB_LATS)
+    _HUB_LONS_RAD = np.radians(_HUB_LONS)
+    _HUB_COS_LAT = np.cos(_HUB_LATS_RAD)
+    
     @classmethod
     def haversine_distance(cls, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
         """Calculate distance in meters between two coordinates"""
-        import math
-        R = 6371000  # Earth's radius in meters
+        R = EARTH_RADIUS_M
         
         lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
         dlat = lat2 - lat1
@@ -69,79 +167,92 @@ class RouteDiscoveryService:
     @classmethod
     def find_nearest_hub(cls, lat: float, lon: float, max_distance_m: float = 2000) -> Optional[str]:
         """Find nearest Cairo hub to coordinates"""
-        nearest_hub = None
-        min_distance = float('inf')
-        
-        for hub_name, (hub_lat, hub_lon) in cls.CAIRO_HUBS.items():
-            distance = cls.haversine_distance(lat, lon, hub_lat, hub_lon)
-            if distance < min_distance and distance <= max_distance_m:
-                min_distance = distance
-                nearest_hub = hub_name
-        
-        return nearest_hub
+        if njit is not None:
+            idx = _nearest_hub_idx(lat, lon, cls._HUB_LATS, cls._HUB_LONS, max_distance_m)
+            return cls._HUB_NAMES[idx] if idx >= 0 else None
+        
+        # Distance to every hub at once, then pick the closest
+        lat_r, lon_r = math.radians(lat), math.radians(lon)
+        dlat = cls._HUB_LATS_RAD - lat_r
+        dlon = cls._HUB_LONS_RAD - lon_r
+        a = np.sin(dlat/2)**2 + math.cos(lat_r) * cls._HUB_COS_LAT * np.sin(dlon/2)**2
+        distances = 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+        
+        idx = int(np.argmin(distances))
+        return cls._HUB_NAMES[idx] if distances[idx] <= max_distance_m else None
     
     @classmethod
-    def extract_trajectory_features(cls, gps_points: List[Dict]) -> Optional[Dict]:
+    def extract_trajectory_features(cls, gps_points: List[Dict]) -> Optional[TrajectoryFeatures]:
         """
         Extract features from GPS trajectory for clustering
         
         Returns:
-            {
-                "start": (lat, lon),
-                "end": (lat, lon),
-                "distance_km": float,
-                "duration_minutes": float,
-                "point_count": int
-            }
+            (start_lat, start_lon, end_lat, end_lon, distance_km)
         """
         if not gps_points or len(gps_points) < cls.MIN_GPS_POINTS:
             return None
         
-        # Sort by timestamp
-        sorted_points = sorted(gps_points, key=lambda p: p.get('timestamp', ''))
+        # Sort by timestamp, unless already in order (the usual case)
+        timestamps = [p.get('timestamp', '') for p in gps_points]
+        if any(t1 > t2 for t1, t2 in zip(timestamps, timestamps[1:])):
+            sorted_points = sorted(gps_points, key=lambda p: p.get('timestamp', ''))
+        else:
+            sorted_points = gps_points
         
         start_point = sorted_points[0]
         end_point = sorted_points[-1]
         
-        # Calculate total distance
-        total_distance = 0
-        for i in range(1, len(sorted_points)):
-            p1 = sorted_points[i-1]
-            p2 = sorted_points[i]
-            total_distance += cls.haversine_distance(
-                p1['latitude'], p1['longitude'],
-                p2['latitude'], p2['longitude']
-            )
-        
-        return {
-            "start": (start_point['latitude'], start_point['longitude']),
-            "end": (end_point['latitude'], end_point['longitude']),
-            "distance_km": total_distance / 1000,
-            "point_count": len(sorted_points)
-        }
+        # 1 Hz tracks run to thousands of points; an evenly strided subset
+        # (always keeping the final fix) is plenty for the trip distance
+        if len(sorted_points) > cls.MAX_DISTANCE_POINTS:
+            track = sorted_points[::math.ceil(len(sorted_points) / cls.MAX_DISTANCE_POINTS)]
+            if track[-1] is not end_point:
+                track.append(end_point)
+        else:
+            track = sorted_points
+        
+        # Calculate total distance over all consecutive segments at once
+        n = len(track)
+        lat_r = np.radians(np.fromiter((p['latitude'] for p in track), dtype=np.float64, count=n))
+        lon_r = np.radians(np.fromiter((p['longitude'] for p in track), dtype=np.float64, count=n))
+        if njit is not None:
+            # Single compiled sweep, no temporary arrays
+            central_angles = _track_central_angles(lat_r, lon_r)
+        else:
+            # Each point's cos(lat) is shared by the segments on either side of it
+            cos_lat = np.cos(lat_r)
+            a = np.sin(np.diff(lat_r)/2)**2 + cos_lat[:-1] * cos_lat[1:] * np.sin(np.diff(lon_r)/2)**2
+            central_angles = float(np.arcsin(np.sqrt(a)).sum())
+        total_distance = 2 * EARTH_RADIUS_M * central_angles
+        
+        return (
+            start_point['latitude'], start_point['longitude'],
+            end_point['latitude'], end_point['longitude'],
+            total_distance / 1000
+        )
     
     @classmethod
-    def compute_trajectory_similarity(cls, traj1: Dict, traj2: Dict) -> float:
+    def compute_trajectory_similarity(cls, batch: TrajectoryBatch, i: int, j: int) -> float:
         """
-        Compute similarity between two trajectories
+        Compute similarity between two trajectories of a batch
         Uses start/end point distances
         
         Returns: Distance score (lower = more similar)
         """
         start_dist = cls.haversine_distance(
-            traj1['start'][0], traj1['start'][1],
-            traj2['start'][0], traj2['start'][1]
+            batch.start_lat[i], batch.start_lon[i],
+            batch.start_lat[j], batch.start_lon[j]
         )
         
         end_dist = cls.haversine_distance(
-            traj1['end'][0], traj1['end'][1],
-            traj2['end'][0], traj2['end'][1]
+            batch.end_lat[i], batch.end_lon[i],
+            batch.end_lat[j], batch.end_lon[j]
         )
         
         return start_dist + end_dist
     
     @classmethod
-    def cluster_trajectories(cls, trajectories: List[Dict]) -> Dict[int, List[int]]:
+    def cluster_trajectories(cls, trajectories: TrajectoryBatch) -> Dict[int, List[int]]:
         """
         Cluster trajectories using DBSCAN
         
@@ -151,51 +262,66 @@ class RouteDiscoveryService:
             logger.warning(f"Not enough trajectories for clustering: {len(trajectories)}")
             return {}
         
-        # Build feature matrix (start_lat, start_lon, end_lat, end_lon)
-        features = np.array([
-            [t['start'][0], t['start'][1], t['end'][0], t['end'][1]]
-            for t in trajectories
-        ])
-        
-        # Normalize coordinates for distance calculation
-        # Approximate: 1 degree lat ≈ 111 km, 1 degree lon ≈ 85 km (at Cairo latitude)
-        features_scaled = features.copy()
-        features_scaled[:, [0, 2]] *= 111000  # lat to meters
-        features_scaled[:, [1, 3]] *= 85000   # lon to meters
-        
-        # Run DBSCAN
-        clustering = DBSCAN(
-            eps=cls.EPSILON_METERS * 2,  # *2 because we sum start+end distances
-            min_samples=cls.MIN_SAMPLES,
-            metric='euclidean'
-        ).fit(features_scaled)
-        
-        # Group by cluster
-        clusters = defaultdict(list)
-        for idx, label in enumerate(clustering.labels_):
-            if label >= 0:  # Ignore noise (-1)
-                clusters[label].append(idx)
+        # Start and end points in radians, for the haversine metric
+        starts = np.radians(np.column_stack((trajectories.start_lat, trajectories.start_lon)))
+        ends = np.radians(np.column_stack((trajectories.end_lat, trajectories.end_lon)))
+        
+        # Cluster starts and ends separately on the sphere
+        start_labels = cls._dbscan_labels(starts)
+        end_labels = cls._dbscan_labels(ends)
+        
+        # A route cluster is the trips sharing both a start and an end cluster.
+        # Encode each (start, end) label pair as one key, ignoring noise (-1),
+        # and bucket trips with a stable sort so indices stay ascending
+        valid = np.flatnonzero((start_labels >= 0) & (end_labels >= 0))
+        keys = start_labels[valid].astype(np.int64) * (int(end_labels.max()) + 1) + end_labels[valid]
+        order = np.argsort(keys, kind='stable')
+        splits = np.flatnonzero(np.diff(keys[order])) + 1
+        groups = [valid[bucket] for bucket in np.split(order, splits) if len(bucket) >= cls.MIN_SAMPLES]
+        
+        # Number clusters by their first trip, as they are encountered
+        groups.sort(key=lambda indices: indices[0])
+        clusters = {cluster_id: indices.tolist() for cluster_id, indices in enumerate(groups)}
         
         logger.info(f"DBSCAN found {len(clusters)} clusters from {len(trajectories)} trajectories")
-        return dict(clusters)
+        return clusters
+    
+    @classmethod
+    def _dbscan_labels(cls, points: np.ndarray) -> np.ndarray:
+        """
+        DBSCAN labels for (lat, lon) radian points within EPSILON_METERS
+
+        The eps-neighborhoods are built once as a sparse graph by a ball tree
+        (memory grows with the neighbor count, not N²) and passed to DBSCAN
+        as precomputed distances.
+        """
+        eps = cls.EPSILON_METERS / EARTH_RADIUS_M
+        # n_jobs=-1 spreads the radius queries (the bulk of DBSCAN's time) over all cores
+        nn = NearestNeighbors(
+            radius=eps, algorithm='ball_tree', metric='haversine', leaf_size=40, n_jobs=-1
+        ).fit(points)
+        # Querying with the points themselves keeps each self-match in the graph,
+        # so min_samples counts the point itself as DBSCAN does
+        graph = nn.radius_neighbors_graph(points, mode='distance')
+        return DBSCAN(eps=eps, min_samples=cls.MIN_SAMPLES, metric='precomputed').fit(graph).labels_
     
     @classmethod
     def extract_route_from_cluster(
         cls, 
-        trajectories: List[Dict],
-        trips: List[Trip]
+        trajectories: TrajectoryBatch,
+        indices: np.ndarray
     ) -> Optional[Dict]:
         """
-        Extract route information from a cluster of similar trajectories
+        Extract route information from the cluster of trajectories at indices
         """
-        if not trajectories:
+        if len(indices) == 0:
             return None
         
         # Average start/end points
-        avg_start_lat = np.mean([t['start'][0] for t in trajectories])
-        avg_start_lon = np.mean([t['start'][1] for t in trajectories])
-        avg_end_lat = np.mean([t['end'][0] for t in trajectories])
-        avg_end_lon = np.mean([t['end'][1] for t in trajectories])
+        avg_start_lat = trajectories.start_lat[indices].mean()
+        avg_start_lon = trajectories.start_lon[indices].mean()
+        avg_end_lat = trajectories.end_lat[indices].mean()
+        avg_end_lon = trajectories.end_lon[indices].mean()
         
         # Snap to nearest hubs
         origin_hub = cls.find_nearest_hub(avg_start_lat, avg_start_lon)
@@ -205,8 +331,10 @@ class RouteDiscoveryService:
             return None
         
         # Calculate average metrics
-        avg_distance = np.mean([t['distance_km'] for t in trajectories])
-        avg_duration = np.mean([t.duration_minutes for t in trips if t.duration_minutes])
+        avg_distance = trajectories.distance_km[indices].mean()
+        durations = trajectories.duration_minutes[indices]
+        durations = durations[~np.isnan(durations) & (durations != 0)]
+        avg_duration = durations.mean() if durations.size else None
         
         # Get hub coordinates
         origin_coords = cls.CAIRO_HUBS[origin_hub]
@@ -221,7 +349,7 @@ class RouteDiscoveryService:
             "dest_lon": dest_coords[1],
             "distance_km": round(avg_distance, 1),
             "avg_duration_minutes": round(avg_duration, 0) if avg_duration else round(avg_distance * 3, 0),
-            "trip_count": len(trajectories)
+            "trip_count": len(indices)
         }
     
     @classmethod
@@ -253,38 +381,64 @@ class RouteDiscoveryService:
         # Get recent trips with GPS data
         cutoff_date = datetime.utcnow() - timedelta(days=days_back)
         
-        trips = db.query(Trip).filter(
+        trip_filter = (
             Trip.created_at >= cutoff_date,
             Trip.gps_points_count >= cls.MIN_GPS_POINTS,
             Trip.gps_points_json.isnot(None)
-        ).all()
+        )
+        trip_count = db.query(func.count(Trip.id)).filter(*trip_filter).scalar()
         
-        logger.info(f"Found {len(trips)} trips with GPS data")
+        logger.info(f"Found {trip_count} trips with GPS data")
         
-        if len(trips) < min_trips:
+        if trip_count < min_trips:
             return {
                 "success": False,
                 "routes_discovered": 0,
                 "routes_updated": 0,
-                "trips_processed": len(trips),
-                "message": f"Not enough trips ({len(trips)}/{min_trips}). Need more data."
+                "trips_processed": trip_count,
+                "message": f"Not enough trips ({trip_count}/{min_trips}). Need more data."
             }
         
-        # Extract trajectory features
-        trajectories = []
-        valid_trips = []
-        
-        for trip in trips:
-            try:
-                gps_points = json.loads(trip.gps_points_json)
-                features = cls.extract_trajectory_features(gps_points)
-                if features:
-                    trajectories.append(features)
-                    valid_trips.append(trip)
-            except (json.JSONDecodeError, TypeError) as e:
-                logger.warning(f"Failed to parse GPS data for trip {trip.trip_id}: {e}")
-                continue
-        
+        # Extract trajectory features, streaming only the needed columns so
+        # each trip's raw JSON can be freed once its features are taken
+        features_list = []
+        durations = []
+        rows = iter(db.query(
+            Trip.trip_id, Trip.gps_points_json, Trip.duration_minutes
+        ).filter(*trip_filter).yield_per(cls.EXTRACT_CHUNK_SIZE))
+        chunks = iter(lambda: list(islice(rows, cls.EXTRACT_CHUNK_SIZE)), [])
+        
+        def collect(results, chunk_durations):
+            for (features, error), duration_minutes in zip(results, chunk_durations):
+                if error:
+                    logger.warning(error)
+                elif features:
+                    features_list.append(features)
+                    durations.append(duration_minutes)
+        
+        if trip_count >= cls.PARALLEL_MIN_TRIPS:
+            # Parse in worker processes, keeping a bounded number of chunks in flight.
+            # Workers must not be forked from this threaded server process with an
+            # open DB cursor, so they start from a clean interpreter instead.
+            start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            max_workers = min(cls.MAX_EXTRACT_WORKERS, os.cpu_count() or 1)
+            with ProcessPoolExecutor(
+                max_workers=max_workers, mp_context=multiprocessing.get_context(start_method)
+            ) as pool:
+                pending = deque()
+                for chunk in chunks:
+                    future = pool.submit(_extract_chunk, [(r[0], r[1]) for r in chunk])
+                    pending.append((future, [r[2] for r in chunk]))
+                    if len(pending) >= 2 * max_workers:
+                        future, chunk_durations = pending.popleft()
+                        collect(future.result(), chunk_durations)
+                for future, chunk_durations in pending:
+                    collect(future.result(), chunk_durations)
+        else:
+            for chunk in chunks:
+                collect(_extract_chunk([(r[0], r[1]) for r in chunk]), [r[2] for r in chunk])
+        
+        trajectories = TrajectoryBatch.from_features(features_list, durations)
         logger.info(f"Extracted features from {len(trajectories)} valid trajectories")
         
         if len(trajectories) < cls.MIN_SAMPLES:
@@ -292,7 +446,7 @@ class RouteDiscoveryService:
                 "success": False,
                 "routes_discovered": 0,
                 "routes_updated": 0,
-                "trips_processed": len(trips),
+                "trips_processed": trip_count,
                 "message": f"Not enough valid trajectories ({len(trajectories)})"
             }
         
@@ -304,63 +458,76 @@ class RouteDiscoveryService:
                 "success": False,
                 "routes_discovered": 0,
                 "routes_updated": 0,
-                "trips_processed": len(trips),
+                "trips_processed": trip_count,
                 "message": "No clusters found. Trips may be too diverse."
             }
         
         # Extract routes from clusters
+        route_infos = []
+        for indices in clusters.values():
+            route_info = cls.extract_route_from_cluster(trajectories, np.asarray(indices))
+            if route_info:
+                route_infos.append(route_info)
+        
+        # Load the routes these clusters could update in one query
+        existing_routes = {}
+        if route_infos:
+            for route in db.query(Route).filter(
+                Route.origin.in_({info['origin'] for info in route_infos})
+            ):
+                existing_routes.setdefault((route.origin, route.destination), route)
+        
         routes_discovered = 0
         routes_updated = 0
+        new_routes = []
         
-        for cluster_id, indices in clusters.items():
-            cluster_trajectories = [trajectories[i] for i in indices]
-            cluster_trips = [valid_trips[i] for i in indices]
+        for route_info in route_infos:
+            # Check if route already exists (or was created earlier in this run)
+            key = (route_info['origin'], route_info['destination'])
+            existing = existing_routes.get(key)
             
-            route_info = cls.extract_route_from_cluster(cluster_trajectories, cluster_trips)
-            
-            if route_info:
-                # Check if route already exists
-                existing = db.query(Route).filter(
-                    Route.origin == route_info['origin'],
-                    Route.destination == route_info['destination']
-                ).first()
-                
-                if existing:
-                    # Update existing route
-                    existing.trip_count += route_info['trip_count']
-                    existing.avg_duration_minutes = (
-                        existing.avg_duration_minutes + route_info['avg_duration_minutes']
-                    ) / 2
-                    routes_updated += 1
-                    logger.info(f"Updated route: {route_info['origin']} → {route_info['destination']}")
-                else:
-                    # Create new route
-                    new_route = Route(
-                        route_id=f"route_discovered_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}_{routes_discovered}",
-                        name=f"{route_info['origin']} - {route_info['destination']}",
-                        origin=route_info['origin'],
-                        destination=route_info['destination'],
-                        origin_lat=route_info['origin_lat'],
-                        origin_lon=route_info['origin_lon'],
-                        dest_lat=route_info['dest_lat'],
-                        dest_lon=route_info['dest_lon'],
-                        distance_km=route_info['distance_km'],
-                        avg_duration_minutes=route_info['avg_duration_minutes'],
-                        fare_egp=round(route_info['distance_km'] * 0.5, 0),  # Estimate fare
-                        trip_count=route_info['trip_count'],
-                        is_active=True
-                    )
-                    db.add(new_route)
-                    routes_discovered += 1
-                    logger.info(f"Discovered new route: {route_info['origin']} → {route_info['destination']}")
-        
+            if existing:
+                # Update existing route, weighting durations by trip count
+                total = existing.trip_count + route_info['trip_count']
+                existing.avg_duration_minutes = (
+                    existing.avg_duration_minutes * existing.trip_count
+                    + route_info['avg_duration_minutes'] * route_info['trip_count']
+                ) / total
+                existing.trip_count = total
+                routes_updated += 1
+                logger.info(f"Updated route: {route_info['origin']} → {route_info['destination']}")
+            else:
+                # Create new route
+                new_route = Route(
+                    route_id=f"route_discovered_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}_{routes_discovered}",
+                    name=f"{route_info['origin']} - {route_info['destination']}",
+                    origin=route_info['origin'],
+                    destination=route_info['destination'],
+                    origin_lat=route_info['origin_lat'],
+                    origin_lon=route_info['origin_lon'],
+                    dest_lat=route_info['dest_lat'],
+                    dest_lon=route_info['dest_lon'],
+                    distance_km=route_info['distance_km'],
+                    avg_duration_minutes=route_info['avg_duration_minutes'],
+                    fare_egp=round(route_info['distance_km'] * 0.5, 0),  # Estimate fare
+                    trip_count=route_info['trip_count'],
+                    is_active=True
+                )
+                new_routes.append(new_route)
+                existing_routes[key] = new_route
+                routes_discovered += 1
+                logger.info(f"Discovered new route: {route_info['origin']} → {route_info['destination']}")
+        
+        db.add_all(new_routes)
         db.commit()
+        RouteSpatialIndex.invalidate()
+        clear_route_caches()
         
         return {
             "success": True,
             "routes_discovered": routes_discovered,
             "routes_updated": routes_updated,
-            "trips_processed": len(trips),
+            "trips_processed": trip_count,
             "clusters_found": len(clusters),
             "message": f"Discovery complete. Found {routes_discovered} new routes, updated {routes_updated} existing."
         }
@@ -398,3 +565,22 @@ class RouteDiscoveryService:
                 "min_gps_points": cls.MIN_GPS_POINTS
             }
         }
+
+
+def _extract_chunk(
+    chunk: List[Tuple[str, Optional[str]]]
+) -> List[Tuple[Optional[TrajectoryFeatures], Optional[str]]]:
+    """
+    Parse and featurize (trip_id, gps_points_json) pairs
+
+    Module-level so it can run in worker processes. Returns
+    (features, error message) per trip, in input order.
+    """
+    results = []
+    for trip_id, gps_points_json in chunk:
+        try:
+            gps_points = orjson.loads(gps_points_json)
+            results.append((RouteDiscoveryService.extract_trajectory_features(gps_points), None))
+        except (json.JSONDecodeError, TypeError) as e:
+            results.append((None, f"Failed to parse GPS data for trip {trip_id}: {e}"))
+    return results
@@ -0,0 +1,103 @@
+"""
+Route Spatial Index
+In-memory index of active route coordinates for proximity lookups
+"""
+
+import logging
+import threading
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.models.database import Route
+
+logger = logging.getLogger(__name__)
+
+# (lat_min, lat_max, lon_min, lon_max)
+Box = Tuple[float, float, float, float]
+
+
+class RouteSpatialIndex:
+    """
+    Active route coordinates held as arrays sorted by origin latitude
+
+    A lookup binary-searches the latitude band of the query box and masks
+    longitude (and optionally the destination box) on that slice only, so
+    cost is O(log N + band) instead of a full table scan. Routes only change
+    on discovery and admin edits, which call invalidate(); the index is also
+    rebuilt every REFRESH_SECONDS so other workers pick up changes.
+    """
+
+    REFRESH_SECONDS = 300
+
+    _route_ids: np.ndarray = np.empty(0, dtype=object)
+    _origin_lat: np.ndarray = np.empty(0)
+    _origin_lon: np.ndarray = np.empty(0)
+    _dest_lat: np.ndarray = np.empty(0)
+    _dest_lon: np.ndarray = np.empty(0)
+    _built_at: Optional[float] = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def rebuild(cls, db: Session) -> int:
+        """Reload active routes from the database. Returns the route count."""
+        rows = db.query(
+            Route.route_id, Route.origin_lat, Route.origin_lon, Route.dest_lat, Route.dest_lon
+        ).filter(Route.is_active == True).order_by(Route.origin_lat).all()
+
+        with cls._lock:
+            cls._route_ids = np.array([r[0] for r in rows], dtype=object)
+            cls._origin_lat = np.array([r[1] for r in rows], dtype=np.float64)
+            cls._origin_lon = np.array([r[2] for r in rows], dtype=np.float64)
+            cls._dest_lat = np.array([r[3] for r in rows], dtype=np.float64)
+            cls._dest_lon = np.array([r[4] for r in rows], dtype=np.float64)
+            cls._built_at = time.monotonic()
+
+        logger.info(f"Route spatial index built with {len(rows)} routes")
+        return len(rows)
+
+    @classmethod
+    def invalidate(cls):
+        """Force a rebuild on the next lookup"""
+        cls._built_at = None
+
+    @classmethod
+    def _ensure_fresh(cls, db: Session):
+        built_at = cls._built_at
+        if built_at is None or time.monotonic() - built_at > cls.REFRESH_SECONDS:
+            cls.rebuild(db)
+
+    @classmethod
+    def candidates(
+        cls,
+        db: Session,
+        origin_box: Box,
+        dest_box: Optional[Box] = None
+    ) -> List[str]:
+        """Route IDs whose origin (and destination, if given) fall in the boxes"""
+        cls._ensure_fresh(db)
+
+        with cls._lock:
+            route_ids = cls._route_ids
+            origin_lat, origin_lon = cls._origin_lat, cls._origin_lon
+            dest_lat, dest_lon = cls._dest_lat, cls._dest_lon
+
+        lat_min, lat_max, lon_min, lon_max = origin_box
+        lo = np.searchsorted(origin_lat, lat_min, side="left")
+        hi = np.searchsorted(origin_lat, lat_max, side="right")
+
+        band_lon = origin_lon[lo:hi]
+        mask = (band_lon >= lon_min) & (band_lon <= lon_max)
+
+        if dest_box is not None:
+            d_lat_min, d_lat_max, d_lon_min, d_lon_max = dest_box
+            band_dest_lat = dest_lat[lo:hi]
+            band_dest_lon = dest_lon[lo:hi]
+            mask &= (
+                (band_dest_lat >= d_lat_min) & (band_dest_lat <= d_lat_max)
+                & (band_dest_lon >= d_lon_min) & (band_dest_lon <= d_lon_max)
+            )
+
+        return route_ids[lo:hi][mask].tolist()
@@ -4,12 +4,27 @@ Matches user-typed text to existing routes for ETA prediction
 """
 
 from sqlalchemy.orm import Session
-from typing import Optional, List, Dict, Tuple
+from functools import lru_cache
+from typing import Any, Optional, List, Dict, Tuple
 import math
-import re
 
+import numpy as np
+
+from app.cache import route_catalog_cache
 from app.models.database import Route
 
+# Route columns used for matching and returned in a match
+MATCH_COLUMNS = (
+    Route.route_id, Route.name, Route.origin, Route.destination,
+    Route.distance_km, Route.avg_duration_minutes, Route.fare_egp
+)
+
+
+@lru_cache(maxsize=4096)
+def _normalize_text(text: str) -> str:
+    # str.split() drops leading/trailing whitespace and collapses runs, no regex needed
+    return ' '.join(text.lower().split())
+
 
 class RouteMatchingService:
     """Service to match custom route inputs to known routes"""
@@ -44,22 +59,37 @@ class RouteMatchingService:
         """Normalize text for matching"""
         if not text:
             return ""
-        # Lowercase, remove extra spaces
-        text = text.lower().strip()
-        text = re.sub(r'\s+', ' ', text)
-        return text
+        # Lowercase, remove extra spaces (memoized)
+        return _normalize_text(text)
     
     @classmethod
     def get_canonical_name(cls, text: str) -> Optional[str]:
         """Get canonical area name from text"""
-        normalized = cls.normalize_text(text)
-        
-        for canonical, aliases in cls.AREA_ALIASES.items():
-            for alias in aliases:
-                if alias in normalized or normalized in alias:
-                    return canonical
-        
-        return None
+        return _canonical_name(cls.normalize_text(text))
+    
+    @classmethod
+    def _route_catalog(cls, db: Session) -> Tuple[List[tuple], Dict[Tuple[str, str], Any]]:
+        """
+        Active routes with their names normalized and canonicalized once,
+        plus an index from (origin_canonical, dest_canonical) to the first
+        such route. Cached until routes change (see clear_route_caches).
+        """
+        catalog = route_catalog_cache.get("active")
+        if catalog is None:
+            entries = []
+            by_canonical = {}
+            for route in db.query(*MATCH_COLUMNS).filter(Route.is_active == True).all():
+                origin_canonical = cls.get_canonical_name(route.origin)
+                dest_canonical = cls.get_canonical_name(route.destination)
+                entries.append((
+                    route,
+                    cls.normalize_text(route.origin),
+                    cls.normalize_text(route.destination)
+                ))
+                by_canonical.setdefault((origin_canonical, dest_canonical), route)
+            catalog = (entries, by_canonical)
+            route_catalog_cache.set("active", catalog)
+        return catalog
     
     @classmethod
     def match_route(
@@ -86,29 +116,22 @@ class RouteMatchingService:
         origin_canonical = cls.get_canonical_name(origin_text)
         dest_canonical = cls.get_canonical_name(dest_text)
         
-        routes = db.query(Route).filter(Route.is_active == True).all()
+        entries, by_canonical = cls._route_catalog(db)
         
         best_match = None
         best_score = 0
         match_type = "none"
         
-        for route in routes:
-            route_origin = cls.normalize_text(route.origin)
-            route_dest = cls.normalize_text(route.destination)
-            route_origin_canonical = cls.get_canonical_name(route.origin)
-            route_dest_canonical = cls.get_canonical_name(route.destination)
-            
-            score = 0
-            
-            # Exact canonical match (highest priority)
-            if origin_canonical and dest_canonical:
-                if (origin_canonical == route_origin_canonical and 
-                    dest_canonical == route_dest_canonical):
-                    score = 1.0
-                    match_type = "exact"
-            
-            # Partial text match
-            if score == 0:
+        # Exact canonical match (highest priority)
+        if origin_canonical and dest_canonical:
+            best_match = by_canonical.get((origin_canonical, dest_canonical))
+            if best_match is not None:
+                best_score = 1.0
+                match_type = "exact"
+        
+        # Partial text match
+        if best_match is None:
+            for route, route_origin, route_dest in entries:
                 origin_match = (
                     origin_normalized in route_origin or 
                     route_origin in origin_normalized or
@@ -122,14 +145,17 @@ class RouteMatchingService:
                 
                 if origin_match and dest_match:
                     score = 0.8
-                    match_type = "partial"
                 elif origin_match or dest_match:
                     score = 0.4
+                else:
+                    continue
+                
+                if score > best_score:
+                    best_score = score
+                    best_match = route
                     match_type = "partial"
-            
-            if score > best_score:
-                best_score = score
-                best_match = route
+                    if score == 0.8:
+                        break  # Nothing later can score higher
         
         if best_match and best_score >= 0.4:
             return {
@@ -191,6 +217,23 @@ class RouteMatchingService:
         
         return round(straight_distance * road_factor, 2)
     
+    @classmethod
+    def bounding_box(
+        cls,
+        lat: float,
+        lon: float,
+        radius_km: float
+    ) -> Tuple[float, float, float, float]:
+        """
+        Lat/lon box that contains every point within radius_km of (lat, lon)
+        
+        Returns:
+            (lat_min, lat_max, lon_min, lon_max)
+        """
+        dlat = radius_km / 111.0
+        dlon = radius_km / (111.0 * max(math.cos(math.radians(lat)), 1e-6))
+        return lat - dlat, lat + dlat, lon - dlon, lon + dlon
+    
     @classmethod
     def find_nearest_hub(
         cls,
@@ -200,27 +243,51 @@ class RouteMatchingService:
         max_distance_km: float = 5.0
     ) -> Optional[Dict]:
         """Find nearest route origin to given coordinates"""
-        routes = db.query(Route).filter(Route.is_active == True).all()
+        lat_min, lat_max, lon_min, lon_max = cls.bounding_box(lat, lon, max_distance_km)
+        rows = db.query(Route.origin, Route.origin_lat, Route.origin_lon).filter(
+            Route.is_active == True,
+            Route.origin_lat.between(lat_min, lat_max),
+            Route.origin_lon.between(lon_min, lon_max)
+        ).all()
         
-        nearest = None
-        min_distance = float('inf')
+        # One candidate per origin name (its first route)
+        origins = {}
+        for name, origin_lat, origin_lon in rows:
+            origins.setdefault(name, (origin_lat, origin_lon))
+        if not origins:
+            return None
         
-        seen_origins = set()
+        names = list(origins)
+        coords = np.radians(np.array(list(origins.values()), dtype=np.float64))
+        lat_r, lon_r = math.radians(lat), math.radians(lon)
         
-        for route in routes:
-            if route.origin in seen_origins:
-                continue
-            seen_origins.add(route.origin)
-            
-            distance = cls.estimate_distance(lat, lon, route.origin_lat, route.origin_lon)
-            
-            if distance < min_distance and distance <= max_distance_km:
-                min_distance = distance
-                nearest = {
-                    "name": route.origin,
-                    "lat": route.origin_lat,
-                    "lon": route.origin_lon,
-                    "distance_km": distance
-                }
-        
-        return nearest
+        # Same formula as estimate_distance, for every candidate at once
+        a = (
+            np.sin((coords[:, 0] - lat_r) / 2)**2
+            + math.cos(lat_r) * np.cos(coords[:, 0]) * np.sin((coords[:, 1] - lon_r) / 2)**2
+        )
+        distances = np.round(6371 * 2 * np.arcsin(np.sqrt(a)) * 1.35, 2)
+        distances[distances > max_distance_km] = np.inf
+        
+        idx = int(np.argmin(distances))
+        if not np.isfinite(distances[idx]):
+            return None
+        
+        name = names[idx]
+        origin_lat, origin_lon = origins[name]
+        return {
+            "name": name,
+            "lat": origin_lat,
+            "lon": origin_lon,
+            "distance_km": cls.estimate_distance(lat, lon, origin_lat, origin_lon)
+        }
+
+
+@lru_cache(maxsize=4096)
+def _canonical_name(normalized: str) -> Optional[str]:
+    for canonical, aliases in RouteMatchingService.AREA_ALIASES.items():
+        for alias in aliases:
+            if alias in normalized or normalized in alias:
+                return canonical
+    
+    return None